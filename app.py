@@ -3,14 +3,12 @@ import os
 import pandas as pd
 import tempfile
 import streamlit as st
-import matplotlib.pyplot as plt
 
 # Добавляем src/ в путь импорта
 sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
 
-from model import load_model
-from preprocessing import clean_data, feature_engineering
-from forecast import forecast
+from preprocessing import clean_data
+from horizon import cached_forecast_horizon
 from utils import calc_metrics
 from visualization import plot_forecast_matplotlib  # ✅ заменено на верную функцию
 
@@ -19,31 +17,9 @@ st.title("📈 Прогноз продаж (на 30 и 7 дней)")
 
 uploaded_file = st.file_uploader("📤 Загрузите Excel-файл с историческими продажами", type=["xlsx"])
 
-def make_future_dataframe(df, periods):
-    last_date = df['Дата'].max()
-    unique_combinations = df[['Категория_товара', 'Товар', 'Город', 'Группа_клиентов', 'Формат_точки']].drop_duplicates()
-    future_dates = pd.date_range(start=last_date + pd.Timedelta(days=1), periods=periods)
-    future_df = unique_combinations.assign(key=1).merge(
-        pd.DataFrame({'Дата': future_dates, 'key': 1}), on='key'
-    ).drop('key', axis=1)
-    future_df['Продажи_кг'] = 0
-    return future_df
-
 def run_forecast(df, days):
-    future_df = make_future_dataframe(df, periods=days)
-    future_metadata = future_df.drop(columns=['Продажи_кг'])
-    full_df = pd.concat([df, future_df], ignore_index=True)
-    full_df = feature_engineering(full_df)
-
-    mask_future = full_df['Дата'] > df['Дата'].max()
-    features = [col for col in full_df.columns if col not in ['Продажи_кг', 'Дата']]
-    X_future = full_df.loc[mask_future, features]
-
-    model = load_model()
-    preds = forecast(model, X_future)
-
-    result = future_metadata.copy()
-    result['prediction'] = preds
+    # Повторный запуск скрипта Streamlit при тех же данных и модели берёт прогноз из кэша
+    result = cached_forecast_horizon(df, days)
 
     # Присоединяем реальные значения если они есть
     truth_df = df[df['Дата'].isin(result['Дата'])][
@@ -81,11 +57,7 @@ if uploaded_file:
     st.download_button("📥 Скачать прогноз на 30 дней", csv_30, file_name="forecast_next_30_days.csv")
 
     st.subheader("📈 Визуализация прогноза на 30 дней")
-    with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as tmp_csv:
-        forecast_30.to_csv(tmp_csv.name, index=False)
-        tmp_csv.flush()
-        plot_forecast_matplotlib(tmp_csv.name)
-        st.pyplot(plt.gcf())
+    st.pyplot(plot_forecast_matplotlib(forecast_30, show=False))
 
     if 'Продажи_кг' in forecast_30.columns and forecast_30['Продажи_кг'].notna().any():
         y_true_30 = forecast_30['Продажи_кг'].fillna(0)
@@ -106,11 +78,7 @@ if uploaded_file:
     st.download_button("📥 Скачать прогноз на 7 дней", csv_7, file_name="forecast_next_7_days.csv")
 
     st.subheader("📈 Визуализация прогноза на 7 дней")
-    with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as tmp_csv:
-        forecast_7.to_csv(tmp_csv.name, index=False)
-        tmp_csv.flush()
-        plot_forecast_matplotlib(tmp_csv.name)
-        st.pyplot(plt.gcf())
+    st.pyplot(plot_forecast_matplotlib(forecast_7, show=False))
 
     if 'Продажи_кг' in forecast_7.columns and forecast_7['Продажи_кг'].notna().any():
         y_true_7 = forecast_7['Продажи_кг'].fillna(0)
@@ -0,0 +1 @@
+# Бенчмарки пайплайна на синтетических данных: python -m benchmarks.run
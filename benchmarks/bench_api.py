@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import itertools
+import tempfile
+import asyncio
+import threading
+import numpy as np
+import httpx
+import uvicorn
+
+from benchmarks.synthetic import make_sales_frame
+from src.preprocessing import fit_clean_stats, clean_data, feature_engineering
+from src.model import train_model
+from src.model_store import model_store
+import src.api as api
+
+# Нагрузочный тест /predict: локальный uvicorn и асинхронный генератор запросов.
+# Сравнивает режим со склейкой запросов и без неё.
+# Запуск: python -m benchmarks.bench_api [requests concurrency]
+
+PORT = 8765
+# Сквозной счётчик запросов на весь запуск, чтобы тела не повторялись между прогонами
+_request_ids = itertools.count()
+
+
+def make_payload(n_products=1, n_cities=2, days=20, seed=0):
+    df = make_sales_frame(n_products, n_cities, days, seed=seed)
+    df['Дата'] = df['Дата'].dt.strftime('%Y-%m-%d')
+    return df.to_dict(orient='list')
+
+
+def unique_payloads(payload):
+    # Каждый запрос чуть отличается телом: иначе /predict отвечает из кэша и замер
+    # показывает только попадания в него
+    while True:
+        sales = list(payload['Продажи_кг'])
+        sales[0] += next(_request_ids) * 1e-6
+        yield dict(payload, Продажи_кг=sales)
+
+
+async def load(n_requests, concurrency, payload):
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+    payloads = unique_payloads(payload)
+    async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{PORT}', timeout=60) as client:
+        async def one():
+            async with sem:
+                start = time.perf_counter()
+                resp = await client.post('/predict', json=next(payloads))
+                resp.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(n_requests)))
+        elapsed = time.perf_counter() - start
+    return np.array(latencies) * 1000, elapsed
+
+
+def use_synthetic_model(n_products=20, n_cities=10, days=120):
+    # Модель с манифестом, обученная на синтетике той же схемы, что и запросы
+    raw = make_sales_frame(n_products, n_cities, days, seed=1)
+    stats = fit_clean_stats(raw)
+    df = feature_engineering(clean_data(raw, stats))
+    features = [col for col in df.columns if col not in ['Продажи_кг', 'Дата']]
+    path = os.path.join(tempfile.mkdtemp(), 'model.pkl')
+    train_model(df, features, 'Продажи_кг', path=path, clean_stats=stats)
+    api.MODEL_PATH = path
+    api.activate(model_store.get(path))
+
+
+def start_server():
+    server = uvicorn.Server(uvicorn.Config(api.app, host='127.0.0.1', port=PORT, log_level='warning'))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+def main(n_requests=500, concurrency=32):
+    use_synthetic_model()
+    payload = make_payload()
+    server, thread = start_server()
+    batcher = api.serving.batcher
+    try:
+        for label, mode in (('без склейки', None), ('micro-batch', batcher)):
+            api.serving.batcher = mode
+            asyncio.run(load(20, concurrency, payload))  # прогрев
+            lat, elapsed = asyncio.run(load(n_requests, concurrency, payload))
+            print(f"{label:>12}: p50 {np.percentile(lat, 50):.1f} мс, p99 {np.percentile(lat, 99):.1f} мс, "
+                  f"{n_requests / elapsed:.0f} запросов/с")
+    finally:
+        api.serving.batcher = batcher
+        server.should_exit = True
+        thread.join()
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
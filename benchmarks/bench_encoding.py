@@ -0,0 +1,49 @@
+import sys
+import json
+import time
+import subprocess
+
+# Пиковая память и время обучения для one-hot и категориального кодирования.
+# Каждый режим запускается в отдельном процессе, чтобы ru_maxrss не смешивался.
+# Запуск: python -m benchmarks.bench_encoding [n_products n_cities days]
+
+
+def run_mode(encoding, n_products, n_cities, days):
+    import lightgbm as lgb
+    from benchmarks.synthetic import make_sales_frame
+    from src.preprocessing import clean_data, feature_engineering
+    from src.profiling import max_rss_mb
+
+    df = clean_data(make_sales_frame(n_products, n_cities, days))
+    start = time.perf_counter()
+    df = feature_engineering(df, encoding=encoding)
+    fe_time = time.perf_counter() - start
+    features = [col for col in df.columns if col not in ['Продажи_кг', 'Дата']]
+    model = lgb.LGBMRegressor(n_estimators=100, learning_rate=0.05, num_leaves=64, verbose=-1)
+    start = time.perf_counter()
+    model.fit(df[features], df['Продажи_кг'])
+    train_time = time.perf_counter() - start
+    peak_mb = max_rss_mb()
+    return {'encoding': encoding, 'columns': len(features), 'fe_s': fe_time,
+            'train_s': train_time, 'peak_rss_mb': peak_mb}
+
+
+def main(n_products=100, n_cities=10, days=120):
+    print(f"{n_products} товаров x {n_cities} городов x {days} дней")
+    for encoding in ('onehot', 'category'):
+        out = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_encoding', '--mode', encoding,
+             str(n_products), str(n_cities), str(days)],
+            capture_output=True, text=True, check=True)
+        res = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{res['encoding']:>9}: {res['columns']:>6} колонок, признаки {res['fe_s']:.2f} с, "
+              f"обучение {res['train_s']:.2f} с, пик RSS "
+              f"{'—' if res['peak_rss_mb'] is None else format(res['peak_rss_mb'], '.0f')} МБ")
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    if args[:1] == ['--mode']:
+        print(json.dumps(run_mode(args[1], *map(int, args[2:]))))
+    else:
+        main(*map(int, args))
@@ -0,0 +1,53 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from src.features import add_lag_features
+
+# Сравнение векторизованного движка лагов с исходной реализацией на groupby/transform.
+# Запуск: python -m benchmarks.bench_features [10000 100000 1000000]
+
+SIZES = [10_000, 100_000, 1_000_000]
+DAYS = 100
+
+
+def make_series(n_rows, days=DAYS, seed=0):
+    rng = np.random.default_rng(seed)
+    n_series = max(1, n_rows // days)
+    df = pd.DataFrame({
+        'Товар': np.repeat(np.arange(n_series) // 10, days),
+        'Город': np.repeat(np.arange(n_series) % 10, days),
+        'Дата': np.tile(pd.date_range('2024-01-01', periods=days).to_numpy(), n_series),
+        'Продажи_кг': rng.gamma(2.0, 25.0, n_series * days),
+    })
+    return df.sort_values(['Товар', 'Город', 'Дата']).reset_index(drop=True)
+
+
+def legacy_features(df):
+    for lag in [1, 7, 14]:
+        df[f'lag_{lag}'] = df.groupby(['Товар', 'Город'])['Продажи_кг'].shift(lag)
+    df['rolling_mean_7'] = df.groupby(['Товар', 'Город'])['Продажи_кг'].transform(lambda x: x.shift(1).rolling(7).mean())
+    df['rolling_mean_14'] = df.groupby(['Товар', 'Город'])['Продажи_кг'].transform(lambda x: x.shift(1).rolling(14).mean())
+    return df
+
+
+def timed(fn, df):
+    start = time.perf_counter()
+    out = fn(df.copy())
+    return time.perf_counter() - start, out
+
+
+def main(sizes):
+    cols = ['lag_1', 'lag_7', 'lag_14', 'rolling_mean_7', 'rolling_mean_14']
+    print(f"{'rows':>10} {'legacy, s':>10} {'vectorized, s':>14} {'speedup':>8}")
+    for n_rows in sizes:
+        df = make_series(n_rows)
+        t_old, old = timed(legacy_features, df)
+        t_new, new = timed(add_lag_features, df)
+        np.testing.assert_allclose(old[cols].to_numpy(), new[cols].to_numpy(), rtol=1e-9, atol=1e-6)
+        print(f"{len(df):>10} {t_old:>10.3f} {t_new:>14.3f} {t_old / t_new:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
@@ -0,0 +1,131 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+from benchmarks.synthetic import SCALES, write_sales_xlsx
+from src.profiling import RunProfiler
+
+# Набор бенчмарков по этапам пайплайна. Время — лучший из нескольких повторов,
+# память — пик tracemalloc в отдельном прогоне. Результат сравнивается с
+# benchmarks/baseline.json; при регрессии больше допуска код выхода 1.
+# Запуск: python -m benchmarks.run [--scale small] [--update-baseline]
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def build_cases(workdir, scale):
+    from src.preprocessing import load_data, fit_clean_stats, clean_data, feature_engineering
+    from src.model import train_model
+    from src.horizon import forecast_next_days
+
+    xlsx = write_sales_xlsx(os.path.join(workdir, 'data', 'raw', 'sales_data.xlsx'), *SCALES[scale])
+    raw = load_data(xlsx, use_cache=False)
+    stats = fit_clean_stats(raw)
+    cleaned = clean_data(raw, stats)
+    engineered = feature_engineering(cleaned)
+    features = [col for col in engineered.columns if col not in ['Продажи_кг', 'Дата']]
+    model = train_model(engineered, features, 'Продажи_кг', clean_stats=stats)
+    load_data(xlsx)  # заполняем колоночный кэш
+
+    def predict_endpoint():
+        import src.api as api
+        from fastapi.testclient import TestClient
+        payload = cleaned.head(200).assign(Дата=lambda d: d['Дата'].dt.strftime('%Y-%m-%d'))
+        payload = payload.to_dict(orient='list')
+        client = TestClient(api.app)
+        api.forecast_cache.clear()
+
+        def run():
+            api.forecast_cache.clear()
+            client.post('/predict', json=payload).raise_for_status()
+        return run
+
+    return {
+        'load_data_excel': lambda: load_data(xlsx, use_cache=False),
+        'load_data_cached': lambda: load_data(xlsx),
+        'clean_data': lambda: clean_data(raw, stats),
+        'feature_engineering': lambda: feature_engineering(cleaned),
+        'train_model': lambda: train_model(engineered, features, 'Продажи_кг', clean_stats=stats),
+        'forecast_next_7_days': lambda: forecast_next_days(7, cleaned, model),
+        'forecast_next_30_days': lambda: forecast_next_days(30, cleaned, model),
+        'predict_endpoint': predict_endpoint(),
+    }
+
+
+def measure(cases, repeats):
+    results = {}
+    for name, fn in cases.items():
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        prof = RunProfiler()
+        prof.trace_memory()
+        with prof.stage(name) as rec:
+            fn()
+        prof.trace_memory(False)
+        results[name] = {'wall_s': min(times), 'peak_mem_mb': rec['peak_mem_mb']}
+        print(f"{name:>24}: {results[name]['wall_s']:8.3f} с, пик {results[name]['peak_mem_mb']:8.1f} МБ")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    failures = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for key in ('wall_s', 'peak_mem_mb'):
+            # Абсолютный порог отсекает шум на совсем коротких замерах
+            floor = 0.05 if key == 'wall_s' else 1.0
+            if res[key] > base[key] * (1 + tolerance) and res[key] - base[key] > floor:
+                failures.append(f"{name}.{key}: {res[key]:.3f} против {base[key]:.3f}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', default='small', choices=sorted(SCALES))
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--tolerance', type=float, default=0.5)
+    parser.add_argument('--only', nargs='*')
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args(argv)
+
+    repo = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix='sales_bench_')
+    os.makedirs(os.path.join(workdir, 'data', 'raw'))
+    # Пайплайн пишет model.pkl и data/processed по относительным путям — изолируем их
+    os.chdir(workdir)
+    try:
+        cases = build_cases(workdir, args.scale)
+        if args.only:
+            cases = {name: fn for name, fn in cases.items() if name in args.only}
+        results = measure(cases, args.repeats)
+    finally:
+        os.chdir(repo)
+
+    try:
+        with open(BASELINE_PATH, encoding='utf-8') as f:
+            baselines = json.load(f)
+    except FileNotFoundError:
+        baselines = {}
+    if args.update_baseline:
+        rounded = {name: {key: round(value, 4) for key, value in res.items()} for name, res in results.items()}
+        baselines[args.scale] = {**baselines.get(args.scale, {}), **rounded}
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, ensure_ascii=False, indent=2)
+        print(f"Базовая линия для {args.scale} обновлена.")
+        return 0
+    failures = compare(results, baselines.get(args.scale, {}), args.tolerance)
+    for failure in failures:
+        print(f"РЕГРЕССИЯ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
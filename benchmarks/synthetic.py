@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+# Детерминированные синтетические продажи в схеме data/raw/sales_data.xlsx
+
+# Масштабы: товары x города x дни
+SCALES = {
+    'small': (20, 5, 120),
+    'medium': (100, 20, 365),
+    'large': (300, 40, 730),
+}
+
+# Имена колонок в исходном Excel (до нормализации в load_data)
+RAW_COLUMNS = {
+    'Категория_товара': 'Категория товара',
+    'Группа_клиентов': 'Группа клиентов',
+    'Формат_точки': 'Формат точки',
+    'Продажи_кг': 'Продажи, кг',
+}
+
+
+def make_sales_frame(n_products=50, n_cities=10, days=120, seed=0, start='2024-01-01'):
+    rng = np.random.default_rng(seed)
+    products = np.arange(1, n_products + 1)
+    cities = np.arange(1, n_cities + 1)
+    series_prod = np.repeat(products, n_cities)
+    series_city = np.tile(cities, n_products)
+    n_series = len(series_prod)
+    dates = pd.date_range(start, periods=days)
+    # Уровень серии и недельная сезонность
+    level = rng.gamma(4.0, 12.0, n_series)
+    weekly = 1 + 0.2 * np.sin(2 * np.pi * dates.dayofweek.to_numpy() / 7)
+    sales = np.repeat(level, days) * np.tile(weekly, n_series)
+    sales = sales * rng.lognormal(0, 0.25, n_series * days)
+    return pd.DataFrame({
+        'Дата': np.tile(dates.to_numpy(), n_series),
+        'Категория_товара': np.repeat(series_prod % 12 + 1, days),
+        'Товар': np.repeat(series_prod, days),
+        'Город': np.repeat(series_city, days),
+        'Группа_клиентов': np.repeat((series_prod + series_city) % 5 + 1, days),
+        'Формат_точки': np.repeat(series_city % 4 + 1, days),
+        'Продажи_кг': sales.round(2),
+    })
+
+
+def make_raw_frame(n_products=50, n_cities=10, days=120, seed=0):
+    return make_sales_frame(n_products, n_cities, days, seed).rename(columns=RAW_COLUMNS)
+
+
+def write_sales_xlsx(path, n_products=50, n_cities=10, days=120, seed=0):
+    make_raw_frame(n_products, n_cities, days, seed).to_excel(path, index=False)
+    return path
@@ -6,53 +6,58 @@ os.environ["LOKY_MAX_CPU_COUNT"] = "2"
 warnings.filterwarnings("ignore", message="Could not find the number of physical cores*")
 
 import pandas as pd
-from src.preprocessing import load_data, clean_data, feature_engineering
-from src.model import train_model, load_model
+from src.pipeline import PipelineSession
+from src.model import train_model
+from src.model_store import model_store
+from src.segments import train_segment_models
 from src.forecast import forecast
 from src.forecast_next_7_days import forecast_next_7_days
 from src.forecast_next_30_days import forecast_next_30_days
 from src.utils import log, save_to_csv_and_json, calc_metrics
+from src.export import export_frame
+from src.profiling import profiler
 from src.visualization import plot_forecast_matplotlib, plot_forecast_plotly
 
-def train_test_split_by_date(df, date_col='Дата', days_test=30):
-    df = df.sort_values(date_col)
-    test_start = df[date_col].max() - pd.Timedelta(days=days_test-1)
-    train_df = df[df[date_col] < test_start].reset_index(drop=True)
-    test_df = df[df[date_col] >= test_start].reset_index(drop=True)
-    return train_df, test_df
+EXPORT_FORMATS = ('parquet',)
 
-def train():
+def train(session=None, segment_col=None):
+    session = session or PipelineSession()
     log("Загрузка и обработка данных...")
-    df = load_data('data/raw/sales_data.xlsx')
-    df = clean_data(df)
-    df = feature_engineering(df)
-    train_df, _ = train_test_split_by_date(df, date_col='Дата', days_test=30)
+    train_df = session.train_df
     features = [col for col in train_df.columns if col not in ['Продажи_кг', 'Дата']]
-    log("Обучение модели...")
-    model = train_model(train_df, features, 'Продажи_кг')
+    if segment_col:
+        # Отдельная модель на каждый сегмент, сегменты обучаются параллельно
+        log(f"Обучение моделей по сегментам ({segment_col})...")
+        model = train_segment_models(train_df, features, 'Продажи_кг', segment_col,
+                                     clean_stats=session.clean_stats)
+    else:
+        log("Обучение модели...")
+        model = train_model(train_df, features, 'Продажи_кг', clean_stats=session.clean_stats)
     log("Модель обучена и сохранена.")
 
-def predict():
+def predict(session=None):
+    session = session or PipelineSession()
     log("Генерация прогноза для новых данных...")
-    model = load_model()
-    df = load_data('data/raw/sales_data.xlsx')
-    df = clean_data(df)
-    df = feature_engineering(df)
-    features = [col for col in df.columns if col not in ['Продажи_кг', 'Дата']]
-    preds = forecast(model, df[features])
+    entry = model_store.get()
+    # Признаки собираются по манифесту модели, а не по колонкам текущих данных
+    df = session.cleaned.copy()
+    X = entry.transformer.transform(df)
+    preds = forecast(entry.model, X)
     df['prediction'] = preds
-    save_to_csv_and_json(df, 'data/processed/sales_forecast')
-    log("Прогноз сохранён в data/processed/sales_forecast.csv и .json.")
+    # Прогноз по всей истории большой: пишем только ключевые колонки в колоночном формате
+    paths = export_frame(df, 'data/processed/sales_forecast', formats=EXPORT_FORMATS)
+    log(f"Прогноз сохранён в {', '.join(paths)}.")
 
-def evaluate():
+def evaluate(session=None):
+    session = session or PipelineSession()
     log("Оценка качества модели на тестовом периоде (последние 30 дней)...")
-    model = load_model()
-    df = load_data('data/raw/sales_data.xlsx')
-    df = clean_data(df)
-    df = feature_engineering(df)
-    _, test_df = train_test_split_by_date(df, date_col='Дата', days_test=30)
-    features = [col for col in test_df.columns if col not in ['Продажи_кг', 'Дата']]
-    preds = forecast(model, test_df[features])
+    entry = model_store.get()
+    df = session.cleaned
+    X = entry.transformer.transform(df)
+    test_start = df['Дата'].max() - pd.Timedelta(days=session.days_test - 1)
+    mask = (df['Дата'] >= test_start).to_numpy()
+    test_df = df[mask].reset_index(drop=True)
+    preds = forecast(entry.model, X[mask])
     metrics = calc_metrics(test_df['Продажи_кг'], preds)
     log(f"MAE: {metrics['MAE']:.2f}, RMSE: {metrics['RMSE']:.2f}, MAPE: {metrics['MAPE'] if not pd.isna(metrics['MAPE']) else '—'}%")
     test_df['prediction'] = preds
@@ -60,29 +65,33 @@ def evaluate():
     log("Тестовый прогноз сохранён в data/processed/sales_forecast_test_period.csv и .json.")
 
 if __name__ == '__main__':
-    train()
-    predict()
-    evaluate()
-    forecast_next_7_days()
-    forecast_next_30_days()
+    # Одна сессия на весь запуск: данные загружаются и обрабатываются один раз
+    session = PipelineSession()
+    train(session)
+    predict(session)
+    evaluate(session)
+    forecast_7 = forecast_next_7_days(session.cleaned)
+    forecast_30 = forecast_next_30_days(session.cleaned)
+    session.report()
+    profiler.save_report('data/processed/run_profile.json')
 
     # Визуализация 7 дней
     plot_forecast_matplotlib(
-        path='data/processed/sales_forecast_next_7_days.csv',
+        forecast_7,
         title='Прогноз продаж по городам (следующие 7 дней)'
     )
     plot_forecast_plotly(
-        path='data/processed/sales_forecast_next_7_days.csv',
+        forecast_7,
         title='Прогноз продаж по городам (следующие 7 дней)'
     )
 
     # Визуализация 30 дней
     plot_forecast_matplotlib(
-        path='data/processed/sales_forecast_next_30_days.csv',
+        forecast_30,
         title='Прогноз продаж по городам (следующие 30 дней)'
     )
     plot_forecast_plotly(
-        path='data/processed/sales_forecast_next_30_days.csv',
+        forecast_30,
         title='Прогноз продаж по городам (следующие 30 дней)'
     )
 
@@ -1,17 +1,156 @@
+import os
+import json
+import hashlib
+import asyncio
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 import pandas as pd
-from src.model import load_model
+from src.model_store import model_store
 from src.forecast import forecast
-from src.preprocessing import clean_data, feature_engineering
+from src.preprocessing import clean_data
+from src.batching import MicroBatcher
+from src.forecast_cache import forecast_cache, make_key
+from src.profiling import profiler
+from src.utils import log
+
+MODEL_PATH = os.environ.get('MODEL_PATH', 'model.pkl')
+# Как часто фоновая задача проверяет файл модели на диске; 0 — только через /model/reload
+MODEL_CHECK_INTERVAL = float(os.environ.get('MODEL_CHECK_INTERVAL', 5))
+
+# Тяжёлая работа (pandas, LightGBM) выполняется в пуле потоков, а не в event loop
+executor = ThreadPoolExecutor(max_workers=int(os.environ.get('PREDICT_WORKERS', os.cpu_count() or 1)))
+# PREDICT_MAX_WAIT_MS=0 отключает склейку запросов
+max_wait_ms = float(os.environ.get('PREDICT_MAX_WAIT_MS', 5))
+
+
+class Serving:
+    # Модель и её батчер меняются вместе: запрос, начатый на старой версии,
+    # досчитывается ею же, а склеиваются только запросы к одной версии
+    def __init__(self, entry):
+        self.entry = entry
+        self.batcher = (MicroBatcher(lambda X: forecast(entry.model, X), executor, max_wait_ms=max_wait_ms)
+                        if max_wait_ms > 0 else None)
+
+
+serving = Serving(model_store.get(MODEL_PATH))
+batches_total = 0
+batched_requests_total = 0
+
+
+def activate(entry):
+    # Подмена обслуживаемой модели; чтения файлов здесь нет, вызывается из event loop
+    global serving, batches_total, batched_requests_total
+    if entry is not serving.entry:
+        old = serving
+        serving = Serving(entry)
+        if old.batcher is not None:
+            batches_total += old.batcher.batches
+            batched_requests_total += old.batcher.requests
+    return serving
+
+
+async def refresh(force=False):
+    # Проверка и загрузка модели (stat, хэш, joblib/lgb) — в пуле потоков, не в event loop
+    loop = asyncio.get_running_loop()
+    entry = await loop.run_in_executor(executor, model_store.reload if force else model_store.get, MODEL_PATH)
+    return activate(entry)
+
+
+async def watch_model():
+    # Новый файл модели на диске подхватывается без перезапуска сервиса
+    while True:
+        await asyncio.sleep(MODEL_CHECK_INTERVAL)
+        try:
+            await refresh()
+        except Exception as exc:
+            # Битый или недописанный файл: продолжаем обслуживать прежнюю версию
+            log(f"Не удалось обновить модель {MODEL_PATH}: {exc}")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    task = asyncio.create_task(watch_model()) if MODEL_CHECK_INTERVAL > 0 else None
+    yield
+    if task is not None:
+        task.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+def prepare_features(transformer, data):
+    df = pd.DataFrame(data)
+    # Очистка по статистикам обучения из манифеста; у старых моделей без них — по запросу.
+    # Выбросы всегда обрезаются, а не удаляются: один прогноз на каждую входную строку
+    df = clean_data(df, stats=transformer.clean_stats, clip=True)
+    return transformer.transform(df)
 
-app = FastAPI()
-model = load_model()
 
 @app.post("/predict")
 async def predict(request: Request):
-    data = await request.json()
-    df = pd.DataFrame(data)
-    df = clean_data(df)
-    df = feature_engineering(df)
-    preds = forecast(model, df)
-    return {"predictions": preds.tolist()}
\ No newline at end of file
+    body = await request.body()
+    active = serving
+    entry = active.entry
+    # Одинаковый запрос к той же модели отдаётся из кэша
+    key = make_key('predict', entry.version, hashlib.sha1(body).hexdigest())
+    cached = forecast_cache.get(key)
+    if cached is not None:
+        return {"predictions": cached}
+    data = json.loads(body)
+    loop = asyncio.get_running_loop()
+    X = await loop.run_in_executor(executor, prepare_features, entry.transformer, data)
+    if active.batcher is not None:
+        preds = await active.batcher.predict(X)
+    else:
+        preds = await loop.run_in_executor(executor, forecast, entry.model, X)
+    preds = preds.tolist()
+    forecast_cache.put(key, preds)
+    return {"predictions": preds}
+
+
+@app.get("/model")
+async def model_info():
+    return dict(model_store.stats(), serving=serving.entry.info())
+
+
+@app.post("/model/reload")
+async def model_reload():
+    # Принудительная проверка файла модели; загрузка идёт в пуле потоков,
+    # текущие запросы продолжают обслуживаться прежней версией
+    active = await refresh(force=True)
+    return active.entry.info()
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return forecast_cache.stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    lines = [profiler.prometheus()]
+    cache = forecast_cache.stats()
+    lines.append('# TYPE sales_forecast_cache_requests_total counter')
+    for result in ('hits', 'disk_hits', 'misses'):
+        lines.append(f'sales_forecast_cache_requests_total{{result="{result}"}} {cache[result]}')
+    lines.append('# TYPE sales_forecast_cache_entries gauge')
+    lines.append(f"sales_forecast_cache_entries {cache['entries']}")
+    batcher = serving.batcher
+    if batcher is not None:
+        lines.append('# TYPE sales_predict_batches_total counter')
+        lines.append(f'sales_predict_batches_total {batches_total + batcher.batches}')
+        lines.append('# TYPE sales_predict_batched_requests_total counter')
+        lines.append(f'sales_predict_batched_requests_total {batched_requests_total + batcher.requests}')
+    lines.append('# TYPE sales_unknown_categories_total counter')
+    for col, count in serving.entry.transformer.unknown.items():
+        lines.append(f'sales_unknown_categories_total{{column="{col}"}} {count}')
+    models = model_store.stats()
+    lines.append('# TYPE sales_model_loads_total counter')
+    lines.append(f"sales_model_loads_total {models['loads']}")
+    lines.append('# TYPE sales_model_load_seconds_total counter')
+    lines.append(f"sales_model_load_seconds_total {models['load_seconds_total']}")
+    lines.append('# TYPE sales_model_load_seconds gauge')
+    lines.append(f'sales_model_load_seconds {serving.entry.load_seconds}')
+    return '\n'.join(lines) + '\n'
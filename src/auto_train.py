@@ -1,12 +1,111 @@
-from src.preprocessing import load_data, clean_data, feature_engineering
-from src.model import train_model
+import os
+import json
+import datetime
+import pandas as pd
+import lightgbm as lgb
+from src.preprocessing import load_data, fit_clean_stats, clean_data, feature_engineering
+from src.features import GROUP_COLS, save_feature_meta
+from src.feature_schema import FeatureTransformer, load_manifest, matrix_to_frame
+from src.model import train_model, load_model, MODEL_PARAMS
+from src.model_store import save_model
+from src.future_grid import trailing_history
+from src.utils import log, replace_file
+
+TARGET = 'Продажи_кг'
+
+
+def watermark_path(model_path='model.pkl'):
+    return os.path.splitext(model_path)[0] + '.watermark.json'
+
+
+def read_watermark(model_path='model.pkl'):
+    try:
+        with open(watermark_path(model_path), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_watermark(last_date, rows, mode, model_path='model.pkl'):
+    meta = {'last_date': pd.Timestamp(last_date).isoformat(), 'rows': int(rows), 'mode': mode,
+            'trained_at': datetime.datetime.now().isoformat(timespec='seconds')}
+    def write(tmp):
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+    replace_file(watermark_path(model_path), write)
+
+
+def _train_full(raw, model_path, encoding):
+    stats = fit_clean_stats(raw)
+    df = feature_engineering(clean_data(raw, stats), encoding=encoding)
+    features = [col for col in df.columns if col not in [TARGET, 'Дата']]
+    return train_model(df, features, TARGET, path=model_path, clean_stats=stats)
+
+
+def _tail_context(raw, cutoff, depth, stats):
+    # Для лагов новых строк нужны только последние depth строк каждой серии до водяной отметки
+    old = clean_data(raw[raw['Дата'] <= cutoff], stats)
+    return trailing_history(old, depth, GROUP_COLS)
+
+
+def _train_incremental(raw, model, manifest, watermark, model_path, extra_trees):
+    cutoff = pd.Timestamp(watermark['last_date'])
+    new = raw[raw['Дата'] > cutoff]
+    if new.empty:
+        log("Новых дат нет, модель не изменилась.")
+        return model, 0
+    stats = manifest['clean_stats'] or fit_clean_stats(raw)
+    params = manifest['params']
+    depth = max(list(params['lags']) + list(params['windows']) + [1])
+    context = _tail_context(raw, cutoff, depth, stats)
+    new = clean_data(new, stats)
+    window = pd.concat([context, new], ignore_index=True)
+    X = FeatureTransformer(manifest).transform(window)
+    is_new = (window['Дата'] > cutoff).to_numpy()
+    X_new = matrix_to_frame(X[is_new], manifest)
+    y_new = window.loc[is_new, TARGET].to_numpy()
+
+    # Дообучение: новые деревья поверх сохранённого бустера
+    updated = lgb.LGBMRegressor(**dict(MODEL_PARAMS, n_estimators=extra_trees))
+    updated.fit(X_new, y_new, init_model=model.booster_)
+    save_feature_meta(manifest, model_path)
+    save_model(updated, model_path)
+    return updated, len(X_new)
+
+
+def run_training_pipeline(data_path, mode='full', model_path='model.pkl',
+                          extra_trees=50, window_days=365, encoding='onehot'):
+    # mode: 'full' — обучение с нуля на всей истории;
+    #       'incremental' — только новые даты после водяной отметки, дообучение через init_model;
+    #       'window' — обучение с нуля на последних window_days днях
+    raw = load_data(data_path)
+    last_date = raw['Дата'].max()
+    watermark = read_watermark(model_path)
+    if mode == 'incremental':
+        manifest = None
+        model = None
+        if watermark and os.path.exists(model_path):
+            model = load_model(model_path)
+            manifest = load_manifest(model, model_path)
+        if manifest is None or not hasattr(model, 'booster_'):
+            log("Нет сохранённой модели с водяной отметкой, выполняется полное обучение.")
+            mode = 'full'
+        else:
+            log(f"Дообучение на данных после {watermark['last_date'][:10]}...")
+            model, rows = _train_incremental(raw, model, manifest, watermark, model_path, extra_trees)
+            log(f"Добавлено строк: {rows}.")
+            write_watermark(last_date, rows, mode, model_path)
+            return model
+    if mode == 'window':
+        log(f"Обучение на скользящем окне {window_days} дней...")
+        raw = raw[raw['Дата'] > last_date - pd.Timedelta(days=window_days)]
+    else:
+        log("Полное обучение...")
+    model = _train_full(raw, model_path, encoding)
+    write_watermark(last_date, len(raw), mode, model_path)
+    return model
 
-def run_training_pipeline(data_path):
-    df = load_data(data_path)
-    df = clean_data(df)
-    df = feature_engineering(df)
-    features = [col for col in df.columns if col not in ['Продажи,_кг', 'Дата']]
-    train_model(df, features, 'Продажи,_кг')
 
 if __name__ == '__main__':
-    run_training_pipeline('data/raw/sales_data.xlsx')
\ No newline at end of file
+    import sys
+    run_training_pipeline('data/raw/sales_data.xlsx', mode=sys.argv[1] if len(sys.argv) > 1 else 'full')
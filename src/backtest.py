@@ -0,0 +1,95 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from src.preprocessing import feature_engineering
+from src.feature_schema import build_manifest, FeatureTransformer
+from src.segments import to_matrix, thread_budget, shared_arrays, attached_arrays, fit_rows
+from src.horizon import forecast_horizon, KEY_COLS
+from src.profiling import profiled
+from src.utils import log
+
+# Бэктест со скользящей точкой отсечения: матрица признаков строится один раз,
+# обучающие строки фолда берутся из неё по индексам, фолды считаются параллельно
+# в пуле процессов. Прогноз на тест — рекурсивный forecast_horizon от отсечки:
+# после неё фактические продажи модели не видны, как и в реальном прогнозе.
+
+TARGET = 'Продажи_кг'
+SERIES_KEYS = ['Товар', 'Город']
+
+
+def rolling_cutoffs(dates, n_folds=4, step_days=7, horizon=30):
+    # Последняя отсечка оставляет после себя полный горизонт, остальные — на step_days раньше
+    last = pd.Timestamp(dates.max()) - pd.Timedelta(days=horizon)
+    return [last - pd.Timedelta(days=step_days * k) for k in reversed(range(n_folds))]
+
+
+def _run_fold(spec, train_rows, categorical, n_jobs, manifest, history, horizon):
+    with attached_arrays(spec) as (X, y):
+        model = fit_rows(X, y, train_rows, categorical, n_jobs)
+    return forecast_horizon(model, history, horizon, transformer=FeatureTransformer(manifest))
+
+
+def fold_metrics(results, by=('horizon',)):
+    # MAE/RMSE/MAPE по группам одним groupby, без циклов по сериям
+    err = results['prediction'] - results['y']
+    frame = results[list(by)].assign(
+        abs_err=err.abs(),
+        sq_err=err ** 2,
+        ape=(err.abs() / results['y'].abs()).where(results['y'] != 0),
+    )
+    table = frame.groupby(list(by), sort=True).agg(
+        n=('abs_err', 'size'), MAE=('abs_err', 'mean'), sq=('sq_err', 'mean'), MAPE=('ape', 'mean'))
+    table['RMSE'] = np.sqrt(table.pop('sq'))
+    table['MAPE'] = table['MAPE'] * 100
+    return table[['n', 'MAE', 'RMSE', 'MAPE']].reset_index()
+
+
+@profiled('backtest')
+def backtest(df, cutoffs=None, horizons=(7, 30), n_folds=4, step_days=7, n_workers=None,
+             encoding='onehot'):
+    max_h = max(horizons)
+    engineered = feature_engineering(df, encoding=encoding)
+    features = [col for col in engineered.columns if col not in [TARGET, 'Дата']]
+    manifest = build_manifest(engineered[features], TARGET)
+    X, categorical = to_matrix(engineered[features])
+    y = engineered[TARGET].to_numpy(dtype=np.float64)
+    dates = engineered['Дата'].to_numpy()
+    if cutoffs is None:
+        cutoffs = rolling_cutoffs(engineered['Дата'], n_folds, step_days, max_h)
+    cutoffs = [pd.Timestamp(c) for c in cutoffs]
+
+    workers, n_jobs = thread_budget(len(cutoffs), n_workers)
+    log(f"Бэктест: {len(cutoffs)} фолдов, процессов {workers}, потоков LightGBM на фолд {n_jobs}")
+    ctx = multiprocessing.get_context('spawn')
+    with shared_arrays(X, y) as spec, ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        futures = [pool.submit(_run_fold, spec, np.flatnonzero(dates <= c.to_datetime64()), categorical,
+                               n_jobs, manifest, df[df['Дата'] <= c], max_h)
+                   for c in cutoffs]
+        forecasts = [future.result() for future in futures]
+
+    parts = []
+    for fold_no, (cutoff, fc) in enumerate(zip(cutoffs, forecasts)):
+        actual = df[(df['Дата'] > cutoff) & (df['Дата'] <= cutoff + pd.Timedelta(days=max_h))]
+        fold = fc.merge(actual[KEY_COLS + [TARGET]], on=KEY_COLS, how='inner')
+        fold = fold.rename(columns={TARGET: 'y'}).assign(
+            fold=fold_no, cutoff=cutoff, day=(fold['Дата'] - cutoff).dt.days)
+        # Оценка горизонта h — по всем дням 1..h рекурсивного прогноза от отсечки
+        for h in horizons:
+            parts.append(fold[fold['day'] <= h].assign(horizon=h))
+    results = pd.concat(parts, ignore_index=True)
+    return {
+        'results': results,
+        'by_horizon': fold_metrics(results, ['horizon']),
+        'by_fold': fold_metrics(results, ['horizon', 'fold', 'cutoff']),
+        'by_series': fold_metrics(results, ['horizon'] + SERIES_KEYS),
+    }
+
+
+if __name__ == '__main__':
+    from src.pipeline import PipelineSession
+    from src.export import export_frame
+    report = backtest(PipelineSession().cleaned)
+    print(report['by_horizon'].to_string(index=False))
+    for name in ('by_horizon', 'by_fold', 'by_series'):
+        export_frame(report[name], f'data/processed/backtest_{name}', formats=('csv',), columns=None)
@@ -0,0 +1,61 @@
+import asyncio
+import numpy as np
+
+
+class MicroBatcher:
+    # Склеивает матрицы признаков одновременных запросов в один вызов predict.
+    # Первый запрос в пачке ждёт не дольше max_wait_ms, пачка ограничена max_batch_rows.
+
+    def __init__(self, predict_fn, executor, max_batch_rows=50_000, max_wait_ms=5):
+        self.predict_fn = predict_fn
+        self.executor = executor
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.requests = 0
+        self._queue = None
+        self._worker = None
+
+    async def predict(self, X):
+        if self._worker is None or self._worker.done():
+            # Очередь и воркер привязываются к текущему event loop при первом запросе
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((X, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        rows = len(batch[0][0])
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while rows < self.max_batch_rows:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            sizes = [len(X) for X, _ in batch]
+            try:
+                X_all = np.vstack([X for X, _ in batch])
+                preds = await loop.run_in_executor(self.executor, self.predict_fn, X_all)
+            except Exception as exc:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            self.batches += 1
+            self.requests += len(batch)
+            for (_, future), part in zip(batch, np.split(preds, np.cumsum(sizes)[:-1])):
+                if not future.done():
+                    future.set_result(part)
@@ -0,0 +1,109 @@
+import os
+import json
+import hashlib
+import pandas as pd
+
+# Версия нормализации колонок: увеличить при изменении логики load_data,
+# чтобы старые записи кэша перестали совпадать по ключу
+COLUMNS_VERSION = 1
+
+CACHE_DIR = 'data/cache'
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+
+def cache_key(path):
+    st = os.stat(path)
+    raw = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{COLUMNS_VERSION}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _entry_path(key, cache_dir):
+    return os.path.join(cache_dir, f"{key}.parquet")
+
+
+def _index_path(cache_dir):
+    return os.path.join(cache_dir, 'index.json')
+
+
+def _read_index(cache_dir):
+    try:
+        with open(_index_path(cache_dir), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_index(index, cache_dir):
+    tmp = _index_path(cache_dir) + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp, _index_path(cache_dir))
+
+
+def read_cached(path, cache_dir=CACHE_DIR):
+    key = cache_key(path)
+    entry = _entry_path(key, cache_dir)
+    if not os.path.exists(entry):
+        return None
+    # memory_map: Arrow читает колонки прямо из отображённого файла
+    df = pd.read_parquet(entry, engine='pyarrow', memory_map=True)
+    # Отмечаем использование записи для LRU-вытеснения
+    os.utime(entry)
+    return df
+
+
+def write_cached(path, df, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    os.makedirs(cache_dir, exist_ok=True)
+    key = cache_key(path)
+    source = os.path.abspath(path)
+    index = _read_index(cache_dir)
+    # Инвалидация: у одного исходного файла остаётся только актуальная запись
+    for old_key, meta in list(index.items()):
+        if meta.get('source') == source and old_key != key:
+            _remove_entry(old_key, index, cache_dir)
+    entry = _entry_path(key, cache_dir)
+    tmp = entry + '.tmp'
+    try:
+        df.to_parquet(tmp, engine='pyarrow', index=False)
+        os.replace(tmp, entry)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    index[key] = {'source': source, 'bytes': os.path.getsize(entry)}
+    evict(index, cache_dir, max_bytes, keep=key)
+    _write_index(index, cache_dir)
+
+
+def _remove_entry(key, index, cache_dir):
+    try:
+        os.remove(_entry_path(key, cache_dir))
+    except FileNotFoundError:
+        pass
+    index.pop(key, None)
+
+
+def evict(index, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, keep=None):
+    # Удаляем давно не использованные записи, пока кэш не влезет в лимит
+    entries = []
+    for key in list(index):
+        entry = _entry_path(key, cache_dir)
+        if not os.path.exists(entry):
+            index.pop(key)
+            continue
+        entries.append((os.path.getmtime(entry), key))
+    total = sum(index[key]['bytes'] for _, key in entries)
+    for _, key in sorted(entries):
+        if total <= max_bytes:
+            break
+        if key == keep:
+            continue
+        total -= index[key]['bytes']
+        _remove_entry(key, index, cache_dir)
+
+
+def clear_cache(cache_dir=CACHE_DIR):
+    index = _read_index(cache_dir)
+    for key in list(index):
+        _remove_entry(key, index, cache_dir)
+    if os.path.isdir(cache_dir):
+        _write_index(index, cache_dir)
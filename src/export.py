@@ -0,0 +1,76 @@
+import os
+import gzip
+from concurrent.futures import ThreadPoolExecutor
+from src.profiling import profiled
+
+# Выгрузка прогнозов: форматы выбираются явно, колонки проецируются до ключевых,
+# а несколько форматов пишутся параллельно
+
+KEY_COLUMNS = ['Дата', 'Категория_товара', 'Товар', 'Город', 'Группа_клиентов', 'Формат_точки',
+               'Продажи_кг', 'prediction']
+FORMATS = ('csv', 'csv.gz', 'parquet', 'ndjson', 'json')
+BATCH_ROWS = 50_000
+
+
+def project(df, columns=KEY_COLUMNS):
+    if columns is None:
+        return df
+    return df[[col for col in columns if col in df.columns]]
+
+
+def _write_csv(df, path):
+    df.to_csv(path, index=False, encoding='utf-8-sig')
+
+
+def _write_csv_gz(df, path):
+    # compresslevel=1: выгрузка почти не медленнее обычного CSV, а файл в разы меньше
+    df.to_csv(path, index=False, encoding='utf-8', compression={'method': 'gzip', 'compresslevel': 1})
+
+
+def _write_parquet(df, path):
+    df.to_parquet(path, index=False, engine='pyarrow')
+
+
+def _write_ndjson(df, path, batch_rows=BATCH_ROWS):
+    # Строки пишутся пачками, целиком весь JSON в памяти не собирается
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'wt', encoding='utf-8') as f:
+        for start in range(0, len(df), batch_rows):
+            chunk = df.iloc[start:start + batch_rows]
+            text = chunk.to_json(orient='records', lines=True, force_ascii=False, date_format='iso')
+            # Завершающий перевод строки у to_json(lines=True) зависит от версии pandas
+            f.write(text if text.endswith('\n') else text + '\n')
+
+
+def _write_json(df, path):
+    df.to_json(path, orient='records', force_ascii=False, date_format='iso')
+
+
+WRITERS = {
+    'csv': ('.csv', _write_csv),
+    'csv.gz': ('.csv.gz', _write_csv_gz),
+    'parquet': ('.parquet', _write_parquet),
+    'ndjson': ('.ndjson', _write_ndjson),
+    'json': ('.json', _write_json),
+}
+
+
+@profiled('export')
+def export_frame(df, path_base, formats=('csv', 'json'), columns=KEY_COLUMNS, parallel=True):
+    for fmt in formats:
+        if fmt not in WRITERS:
+            raise ValueError(f"Неизвестный формат выгрузки: {fmt}")
+    df = project(df, columns)
+    dirname = os.path.dirname(path_base)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    jobs = {path_base + WRITERS[fmt][0]: WRITERS[fmt][1] for fmt in formats}
+    if parallel and len(jobs) > 1:
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            futures = [pool.submit(writer, df, path) for path, writer in jobs.items()]
+            for future in futures:
+                future.result()
+    else:
+        for path, writer in jobs.items():
+            writer(df, path)
+    return list(jobs)
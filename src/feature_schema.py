@@ -0,0 +1,185 @@
+import numpy as np
+import pandas as pd
+from src.features import (CATEGORICAL_COLS, category_key, block_positions, lag_feature_arrays,
+                          feature_params_from_columns, category_vocabulary, load_feature_meta)
+from src.profiling import profiled
+from src.utils import log
+
+# Манифест признаков хранится в model.features.json рядом с моделью:
+# порядок колонок, типы, словари категорий и параметры построения признаков.
+# По нему инференс собирает матрицу ровно в раскладке обучения.
+
+TIME_FEATURES = ['dayofweek', 'month', 'year']
+
+
+def _onehot_vocabulary(columns):
+    # Значения one-hot колонок восстанавливаются из имён вида "<колонка>_<значение>"
+    vocab = {col: [] for col in CATEGORICAL_COLS}
+    for name in columns:
+        matches = [col for col in CATEGORICAL_COLS if name.startswith(col + '_')]
+        if matches:
+            col = max(matches, key=len)
+            vocab[col].append(name[len(col) + 1:])
+    return vocab
+
+
+def build_manifest(X, target='Продажи_кг', params=None, clean_stats=None):
+    columns = list(X.columns)
+    vocab = category_vocabulary(X)
+    encoding = 'category' if vocab else 'onehot'
+    return {
+        'encoding': encoding,
+        'target': target,
+        'columns': columns,
+        'dtypes': {col: str(X[col].dtype) for col in columns},
+        'categories': vocab if vocab else _onehot_vocabulary(columns),
+        'params': params or feature_params_from_columns(columns),
+        'clean_stats': clean_stats,
+    }
+
+
+def manifest_from_model(model, target='Продажи_кг'):
+    # Для моделей, обученных до появления манифеста: раскладка берётся из самой модели
+    columns = list(model.feature_name_)
+    return {
+        'encoding': 'onehot',
+        'target': target,
+        'columns': columns,
+        'dtypes': {},
+        'categories': _onehot_vocabulary(columns),
+        'params': feature_params_from_columns(columns),
+        'clean_stats': None,
+    }
+
+
+def load_manifest(model=None, model_path='model.pkl'):
+    meta = load_feature_meta(model_path)
+    if meta and 'columns' in meta:
+        # Манифест мог остаться от другой модели (например, model.pkl обновлён из git,
+        # а model.features.json — нет): сверяем раскладку с самой моделью
+        names = getattr(model, 'feature_name_', None)
+        if names is None or list(names) == meta['columns']:
+            return meta
+        log(f"Манифест {model_path} не совпадает с моделью ({len(meta['columns'])} колонок "
+            f"против {len(names)}), раскладка берётся из модели.")
+    if model is not None:
+        return manifest_from_model(model)
+    return None
+
+
+class FeatureTransformer:
+    # Строит матрицу признаков сразу в заранее выделенный float32-массив
+    # без промежуточных DataFrame (get_dummies, concat и т.п.)
+
+    def __init__(self, manifest):
+        self.manifest = manifest
+        self.columns = manifest['columns']
+        self.encoding = manifest['encoding']
+        self.params = manifest['params']
+        self.target = manifest.get('target', 'Продажи_кг')
+        self.clean_stats = manifest.get('clean_stats')
+        self.index = {name: i for i, name in enumerate(self.columns)}
+        self.vocab = {}
+        self.slots = {}
+        for col in CATEGORICAL_COLS:
+            values = manifest['categories'].get(col, [])
+            # Словарь хранится в каноническом виде ключей (см. category_key), как и входные значения
+            self.vocab[col] = pd.Index([category_key(v) for v in values])
+            if self.encoding == 'category':
+                self.slots[col] = self.index.get(col)
+            else:
+                self.slots[col] = np.array([self.index[f'{col}_{v}'] for v in values], dtype=np.int64)
+        self.unknown = {col: 0 for col in CATEGORICAL_COLS}
+        self._check_coverage()
+
+    def _check_coverage(self):
+        # Каждая колонка манифеста должна чем-то заполняться: иначе при расхождении
+        # параметров лагов с обучением она молча осталась бы нулевой на инференсе
+        p = self.params
+        filled = set(TIME_FEATURES)
+        filled.update(f'lag_{lag}' for lag in p['lags'])
+        filled.update(f'rolling_{stat}_{window}' for stat in p['stats'] for window in p['windows'])
+        filled.update(f'ewm_{span}' for span in p['ewm_spans'])
+        for col, slots in self.slots.items():
+            if self.encoding == 'category':
+                filled.add(col)
+            else:
+                filled.update(self.columns[j] for j in slots)
+        missing = [name for name in self.columns if name not in filled]
+        if missing:
+            raise ValueError(f"Колонки манифеста не строятся трансформером: {missing[:10]}"
+                             f"{' …' if len(missing) > 10 else ''} (параметры признаков: {p})")
+
+    def _category_codes(self, df, col):
+        # Ключи строятся только по уникальным значениям, а не по каждой строке
+        if col == 'prod_city':
+            prod, prod_inv = np.unique(df['Товар'].to_numpy(), return_inverse=True)
+            city, city_inv = np.unique(df['Город'].to_numpy(), return_inverse=True)
+            pair, inv = np.unique(prod_inv * len(city) + city_inv, return_inverse=True)
+            keys = [f'{category_key(prod[p // len(city)])}_{category_key(city[p % len(city)])}' for p in pair]
+        else:
+            uniq, inv = np.unique(df[col].to_numpy(), return_inverse=True)
+            keys = [category_key(u) for u in uniq]
+        codes = self.vocab[col].get_indexer(keys)[inv]
+        n_unknown = int((codes < 0).sum())
+        if n_unknown:
+            # Неизвестные значения дают нулевые one-hot слоты / пропуск кода — учитываем их
+            self.unknown[col] += n_unknown
+            log(f"Неизвестные значения {col}: {n_unknown} из {len(codes)} строк.")
+        return codes
+
+    @profiled('feature_transform')
+    def transform(self, df, out=None):
+        n = len(df)
+        X = out if out is not None else np.zeros((n, len(self.columns)), dtype=np.float32)
+        if out is not None:
+            X.fill(0)
+        dates = pd.DatetimeIndex(df['Дата'])
+        prod = df['Товар'].to_numpy()
+        city = df['Город'].to_numpy()
+
+        # Лаги считаются в порядке (Товар, Город, Дата) и раскладываются обратно по строкам
+        order = np.lexsort((dates.asi8, city, prod))
+        group_id, pos = block_positions([prod[order], city[order]])
+        if self.target in df.columns:
+            values = df[self.target].to_numpy(dtype='float64')[order]
+        else:
+            values = np.full(n, np.nan)
+        lag_cols = lag_feature_arrays(values, group_id, pos, self.params['lags'], self.params['windows'],
+                                      self.params['stats'], self.params['ewm_spans'])
+        for name, arr in lag_cols.items():
+            j = self.index.get(name)
+            if j is not None:
+                X[order, j] = np.nan_to_num(arr, nan=0.0)
+
+        for name, arr in (('dayofweek', dates.dayofweek), ('month', dates.month), ('year', dates.year)):
+            j = self.index.get(name)
+            if j is not None:
+                X[:, j] = arr
+
+        for col in CATEGORICAL_COLS:
+            codes = self._category_codes(df, col)
+            if self.encoding == 'category':
+                j = self.slots[col]
+                if j is not None:
+                    X[:, j] = np.where(codes < 0, np.nan, codes)
+            else:
+                known = codes >= 0
+                X[np.flatnonzero(known), self.slots[col][codes[known]]] = 1
+        return X
+
+
+def load_transformer(model, model_path='model.pkl'):
+    return FeatureTransformer(load_manifest(model, model_path))
+
+
+def matrix_to_frame(X, manifest):
+    # Матрица обратно в DataFrame с именами колонок манифеста; категориальные
+    # колонки восстанавливаются как pandas category с тем же словарём
+    df = pd.DataFrame(X, columns=manifest['columns'])
+    if manifest['encoding'] == 'category':
+        for col in CATEGORICAL_COLS:
+            if col in df.columns:
+                codes = np.nan_to_num(df[col].to_numpy(), nan=-1).astype(np.int64)
+                df[col] = pd.Categorical.from_codes(codes, categories=manifest['categories'][col])
+    return df
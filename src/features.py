@@ -0,0 +1,212 @@
+import os
+import re
+import json
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from src.utils import replace_file
+
+# Параметры лаговых признаков по умолчанию (совпадают с исходной моделью)
+GROUP_COLS = ['Товар', 'Город']
+LAGS = (1, 7, 14)
+WINDOWS = (7, 14)
+STATS = ('mean',)
+EWM_SPANS = ()
+
+CATEGORICAL_COLS = ['Категория_товара', 'Товар', 'Город', 'Группа_клиентов', 'Формат_точки', 'prod_city']
+CATEGORY_KEY_COLS = [col for col in CATEGORICAL_COLS if col != 'prod_city']
+
+
+def group_positions(df, group_cols=GROUP_COLS):
+    # Кадр должен быть отсортирован по group_cols и дате: группы идут сплошными блоками.
+    # Возвращает номер группы и позицию строки внутри своей группы.
+    return block_positions([df[col].to_numpy() for col in group_cols])
+
+
+def block_positions(key_arrays):
+    n = len(key_arrays[0]) if key_arrays else 0
+    starts = np.zeros(n, dtype=bool)
+    if n:
+        starts[0] = True
+    for values in key_arrays:
+        starts[1:] |= values[1:] != values[:-1]
+    group_id = np.cumsum(starts) - 1
+    start_idx = np.flatnonzero(starts)
+    pos = np.arange(n) - start_idx[group_id]
+    return group_id, pos
+
+
+def _lag(values, pos, k):
+    out = np.full(len(values), np.nan)
+    out[k:] = values[:-k] if k else values
+    out[pos < k] = np.nan
+    return out
+
+
+def _rolling(values, pos, window, stat):
+    # Окно по предыдущим window значениям группы (эквивалент shift(1).rolling(window))
+    n = len(values)
+    out = np.full(n, np.nan)
+    if n <= window:
+        return out
+    isnan = np.isnan(values)
+    filled = np.where(isnan, 0.0, values)
+    nan_cs = np.concatenate(([0], np.cumsum(isnan)))
+    has_nan = (nan_cs[window:n] - nan_cs[:n - window]) > 0
+    if stat in ('mean', 'std'):
+        cs = np.concatenate(([0.0], np.cumsum(filled)))
+        total = cs[window:n] - cs[:n - window]
+        if stat == 'mean':
+            res = total / window
+        else:
+            cs2 = np.concatenate(([0.0], np.cumsum(filled * filled)))
+            total2 = cs2[window:n] - cs2[:n - window]
+            var = (total2 - total * total / window) / (window - 1)
+            res = np.sqrt(np.clip(var, 0, None))
+    elif stat in ('min', 'max'):
+        win = sliding_window_view(values, window)[:n - window]
+        res = win.min(axis=1) if stat == 'min' else win.max(axis=1)
+    else:
+        raise ValueError(f"Неизвестная статистика окна: {stat}")
+    res[has_nan] = np.nan
+    out[window:] = res
+    out[pos < window] = np.nan
+    return out
+
+
+def _ewm(values, group_id, pos, span):
+    # Эквивалент shift(1).ewm(span=span).mean() (adjust=True, ignore_na=False).
+    # Все группы обновляются одновременно: цикл идёт по позициям, а не по сериям.
+    n_groups = int(group_id.max()) + 1 if len(values) else 0
+    length = int(pos.max()) + 1 if len(values) else 0
+    grid = np.full((n_groups, length), np.nan)
+    grid[group_id, pos] = values
+    decay = 1 - 2.0 / (span + 1)
+    num = np.zeros(n_groups)
+    den = np.zeros(n_groups)
+    res = np.full((n_groups, length), np.nan)
+    for k in range(length):
+        col = grid[:, k]
+        valid = ~np.isnan(col)
+        num = num * decay + np.where(valid, col, 0.0)
+        den = den * decay + valid
+        with np.errstate(invalid='ignore', divide='ignore'):
+            res[:, k] = np.where(den > 0, num / den, np.nan)
+    return _lag(res[group_id, pos], pos, 1)
+
+
+def add_lag_features(df, target='Продажи_кг', group_cols=GROUP_COLS, lags=LAGS,
+                     windows=WINDOWS, stats=STATS, ewm_spans=EWM_SPANS):
+    group_id, pos = group_positions(df, group_cols)
+    values = df[target].to_numpy(dtype='float64')
+    new_cols = lag_feature_arrays(values, group_id, pos, lags, windows, stats, ewm_spans)
+    for name, col in new_cols.items():
+        df[name] = col
+    return df
+
+
+def lag_feature_arrays(values, group_id, pos, lags=LAGS, windows=WINDOWS,
+                       stats=STATS, ewm_spans=EWM_SPANS):
+    new_cols = {}
+    for lag in lags:
+        new_cols[f'lag_{lag}'] = _lag(values, pos, lag)
+    for stat in stats:
+        for window in windows:
+            new_cols[f'rolling_{stat}_{window}'] = _rolling(values, pos, window, stat)
+    for span in ewm_spans:
+        new_cols[f'ewm_{span}'] = _ewm(values, group_id, pos, span)
+    return new_cols
+
+
+def feature_params(lags=LAGS, windows=WINDOWS, stats=STATS, ewm_spans=EWM_SPANS):
+    return {'lags': list(lags), 'windows': list(windows), 'stats': list(stats),
+            'ewm_spans': list(ewm_spans)}
+
+
+_LAG_NAME = re.compile(r'^lag_(\d+)$')
+_ROLLING_NAME = re.compile(r'^rolling_([a-z]+)_(\d+)$')
+_EWM_NAME = re.compile(r'^ewm_(\d+)$')
+
+
+def feature_params_from_columns(columns):
+    # Параметры лагов по именам колонок (lag_N, rolling_<stat>_W, ewm_S): сохраняются
+    # ровно те настройки, с которыми строились признаки обучения, а не значения по умолчанию
+    lags, windows, stats, spans = set(), set(), [], set()
+    for name in columns:
+        if match := _LAG_NAME.match(name):
+            lags.add(int(match.group(1)))
+        elif match := _ROLLING_NAME.match(name):
+            if match.group(1) not in stats:
+                stats.append(match.group(1))
+            windows.add(int(match.group(2)))
+        elif match := _EWM_NAME.match(name):
+            spans.add(int(match.group(1)))
+    return feature_params(sorted(lags), sorted(windows), stats, sorted(spans))
+
+
+_INTEGRAL_FLOAT = re.compile(r'^(-?\d+)\.0+$')
+
+
+def category_key(value):
+    # Ключ категории не зависит от типа колонки: 31, 31.0, '31.0' -> '31'
+    # (колонка с пропуском приходит как float, и без этого one-hot слоты не совпадают)
+    if isinstance(value, str):
+        if '_' in value:
+            return '_'.join(category_key(part) for part in value.split('_'))
+        match = _INTEGRAL_FLOAT.match(value)
+        return match.group(1) if match else value
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def canonicalize_key_columns(df, cols=CATEGORY_KEY_COLS):
+    # Целочисленные float-колонки ключей (после заполнения пропусков) обратно в int64,
+    # чтобы имена one-hot колонок и словари категорий не зависели от пропусков во входе
+    for col in cols:
+        if col in df.columns and pd.api.types.is_float_dtype(df[col]):
+            values = df[col].to_numpy()
+            if not np.isnan(values).any() and (values == np.round(values)).all():
+                df[col] = values.astype(np.int64)
+    return df
+
+
+def encode_categories(df, categories=None):
+    # Переводит категориальные колонки в pandas category. С переданным словарём
+    # коды совпадают с обучением, неизвестные значения становятся пропуском.
+    for col in CATEGORICAL_COLS:
+        if categories is not None:
+            vocab = categories[col]
+        else:
+            vocab = np.sort(df[col].dropna().unique()).tolist()
+        values = df[col].astype(str) if col == 'prod_city' else df[col]
+        df[col] = pd.Categorical(values, categories=vocab)
+    return df
+
+
+def category_vocabulary(df):
+    vocab = {}
+    for col in CATEGORICAL_COLS:
+        if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+            vocab[col] = df[col].cat.categories.tolist()
+    return vocab
+
+
+def features_path(model_path='model.pkl'):
+    return os.path.splitext(model_path)[0] + '.features.json'
+
+
+def save_feature_meta(meta, model_path='model.pkl'):
+    def write(tmp):
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+    # Манифест читается сервисом на лету — подменяется атомарно, как и сама модель
+    replace_file(features_path(model_path), write)
+
+
+def load_feature_meta(model_path='model.pkl'):
+    path = features_path(model_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
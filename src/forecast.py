@@ -1,2 +1,9 @@
+import warnings
+from src.profiling import profiled
+
+@profiled('forecast')
 def forecast(model, df):
-    return model.predict(df)
\ No newline at end of file
+    # Матрица из FeatureTransformer уже выровнена по манифесту, имена колонок ей не нужны
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message='X does not have valid feature names')
+        return model.predict(df)
\ No newline at end of file
@@ -0,0 +1,126 @@
+import os
+import time
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+# Кэш прогнозов: ключ — хэш содержимого истории, горизонт и хэш файла модели.
+# Память — LRU с TTL; при заданном каталоге записи дублируются на диск.
+
+_model_hashes = {}
+
+
+def frame_fingerprint(df):
+    h = hashlib.sha1()
+    h.update('|'.join(map(str, df.columns)).encode('utf-8'))
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def model_fingerprint(path='model.pkl'):
+    # Хэш файла модели пересчитывается только при изменении mtime/размера
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _model_hashes.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    _model_hashes[path] = (stamp, h.hexdigest())
+    return h.hexdigest()
+
+
+def make_key(*parts):
+    return hashlib.sha1('|'.join(map(str, parts)).encode('utf-8')).hexdigest()
+
+
+class ForecastCache:
+
+    def __init__(self, max_entries=64, ttl=3600, disk_dir=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.pkl")
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+        value = self._read_disk(key, now)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self._put_memory(key, value, now)
+        return value
+
+    def put(self, key, value):
+        self._put_memory(key, value, time.time())
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            tmp = self._disk_path(key) + '.tmp'
+            with open(tmp, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._disk_path(key))
+
+    def _put_memory(self, key, value, now):
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _read_disk(self, key, now):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            if os.path.getmtime(path) + self.ttl <= now:
+                os.remove(path)
+                return None
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                    'entries': len(self._entries)}
+
+
+# Общий кэш процесса; FORECAST_CACHE_DIR включает дисковый уровень
+forecast_cache = ForecastCache(
+    max_entries=int(os.environ.get('FORECAST_CACHE_SIZE', 64)),
+    ttl=float(os.environ.get('FORECAST_CACHE_TTL', 3600)),
+    disk_dir=os.environ.get('FORECAST_CACHE_DIR') or None,
+)
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+# Сетка будущих дат серия × дата без merge по фиктивному ключу: серии кодируются
+# целыми числами, сетка собирается через np.repeat по кодам.
+
+SERIES_COLS = ['Категория_товара', 'Товар', 'Город', 'Группа_клиентов', 'Формат_точки']
+
+
+def series_index(history, series_cols=SERIES_COLS):
+    # Номер серии для каждой строки и таблица уникальных серий (в порядке сортировки ключей)
+    codes = []
+    uniques = []
+    for col in series_cols:
+        c, u = pd.factorize(history[col], sort=True)
+        codes.append(c)
+        uniques.append(u)
+    sizes = [len(u) for u in uniques]
+    key = np.ravel_multi_index(codes, sizes) if codes else np.zeros(len(history), dtype=np.int64)
+    series_keys, series_id = np.unique(key, return_inverse=True)
+    series_codes = np.unravel_index(series_keys, sizes)
+    series = pd.DataFrame({col: uniques[i].take(series_codes[i]) for i, col in enumerate(series_cols)})
+    return series_id, series
+
+
+def build_future_grid(history, horizon, series_cols=SERIES_COLS, per_series_start=False, start=None):
+    # horizon — одно число или массив по сериям (в порядке series_index).
+    # per_series_start=True: каждая серия продолжается со своей последней даты,
+    # иначе все — с общей (start или последняя дата истории + 1 день).
+    series_id, series = series_index(history, series_cols)
+    n_series = len(series)
+    if per_series_start:
+        last = pd.Series(history['Дата'].to_numpy()).groupby(series_id).max().to_numpy()
+        starts = last + np.timedelta64(1, 'D')
+    else:
+        first = pd.Timestamp(start) if start is not None else history['Дата'].max() + pd.Timedelta(days=1)
+        starts = np.full(n_series, first.to_datetime64())
+    if np.ndim(horizon) == 0 and not per_series_start:
+        # Общий старт и горизонт: даты — np.tile, ключи серий — np.repeat
+        dates = pd.date_range(start=starts[0] if n_series else start, periods=int(horizon)).to_numpy()
+        grid = {'Дата': np.tile(dates, n_series)}
+        for col in series_cols:
+            grid[col] = np.repeat(series[col].to_numpy(), int(horizon))
+        return pd.DataFrame(grid, copy=False)
+    horizons = np.broadcast_to(np.asarray(horizon, dtype=np.int64), (n_series,))
+    rows = np.repeat(np.arange(n_series), horizons)
+    # Смещение строки внутри своей серии: 0, 1, ..., horizon-1
+    offsets = np.arange(len(rows)) - np.repeat(np.cumsum(horizons) - horizons, horizons)
+    grid = {'Дата': starts[rows] + offsets.astype('timedelta64[D]')}
+    for col in series_cols:
+        grid[col] = series[col].to_numpy()[rows]
+    return pd.DataFrame(grid, copy=False)
+
+
+def trailing_history(history, depth, group_cols=SERIES_COLS):
+    # Только последние depth строк каждой серии — ровно столько нужно для лагов
+    history = history.sort_values('Дата', kind='stable')
+    return history.groupby(group_cols, sort=False).tail(depth)
@@ -0,0 +1,162 @@
+import numpy as np
+import pandas as pd
+from src.model_store import model_store
+from src.preprocessing import load_data, clean_data
+from src.feature_schema import load_transformer
+from src.forecast import forecast
+from src.profiling import profiled
+from src.features import GROUP_COLS, block_positions
+from src.future_grid import SERIES_COLS, series_index, build_future_grid
+from src.forecast_cache import forecast_cache, frame_fingerprint, make_key
+from src.utils import save_to_csv_and_json, log, calc_metrics
+
+KEY_COLS = ['Дата'] + SERIES_COLS
+
+
+def _window(buf, groups, t, width):
+    # Последние width значений кольцевых буферов групп (от самого свежего к старому)
+    idx = (t[:, None] - 1 - np.arange(width)) % buf.shape[1]
+    return buf[groups[:, None], idx]
+
+
+def _rolling(win, stat):
+    if stat == 'mean':
+        return win.mean(axis=1)
+    if stat == 'std':
+        return win.std(axis=1, ddof=1)
+    if stat == 'min':
+        return win.min(axis=1)
+    if stat == 'max':
+        return win.max(axis=1)
+    raise ValueError(f"Неизвестная статистика окна: {stat}")
+
+
+def _ewm_state(hist, span):
+    # Состояние EWM (adjust=True) по истории каждой серии: числитель и знаменатель
+    decay = 1 - 2.0 / (span + 1)
+    num = np.zeros(hist.shape[0])
+    den = np.zeros(hist.shape[0])
+    for k in range(hist.shape[1]):
+        col = hist[:, k]
+        valid = ~np.isnan(col)
+        num = num * decay + np.where(valid, col, 0.0)
+        den = den * decay + valid
+    return num, den
+
+
+@profiled('forecast_horizon')
+def forecast_horizon(model, history, horizon, transformer=None, per_series_start=False):
+    # Рекурсивный прогноз: прогноз модели записывается в кольцевой буфер и служит
+    # лагом для следующих строк. Лаги, как и при обучении, идут по группам GROUP_COLS
+    # (Товар, Город): если в группе несколько серий (группы клиентов, форматы), их строки
+    # за день следуют друг за другом в порядке серий. Строки считаются «волнами»:
+    # волна p — p-я будущая строка каждой группы, на волну один пакетный predict.
+    transformer = transformer or load_transformer(model)
+    params = transformer.params
+    target = transformer.target
+    index = transformer.index
+
+    series_id, series = series_index(history)
+    n_series = len(series)
+    series_group = series.groupby(GROUP_COLS, sort=True, dropna=False).ngroup().to_numpy()
+    n_groups = int(series_group.max()) + 1 if n_series else 0
+
+    # Строки истории в порядке (группа, дата, исходный порядок) — как в FeatureTransformer;
+    # позиция строки от конца своей группы
+    group_id = series_group[series_id]
+    order = np.lexsort((np.arange(len(history)), history['Дата'].to_numpy(), group_id))
+    group_id = group_id[order]
+    values = history[target].to_numpy(dtype='float64')[order]
+    _, pos = block_positions([group_id])
+    pos_from_end = np.bincount(group_id, minlength=n_groups)[group_id] - 1 - pos
+
+    # Кольцевой буфер: последние depth значений каждой группы, пропуски — NaN
+    depth = max(list(params['lags']) + list(params['windows']) + [1])
+    buf = np.full((n_groups, depth), np.nan)
+    keep = pos_from_end < depth
+    buf[group_id[keep], depth - 1 - pos_from_end[keep]] = values[keep]
+    t = np.full(n_groups, depth, dtype=np.int64)
+
+    ewm = {}
+    if params['ewm_spans']:
+        length = int(pos_from_end.max()) + 1
+        hist = np.full((n_groups, length), np.nan)
+        hist[group_id, length - 1 - pos_from_end] = values
+        ewm = {span: _ewm_state(hist, span) for span in params['ewm_spans']}
+
+    result = build_future_grid(history, horizon, per_series_start=per_series_start)
+    # Сетка идёт блоками по сериям; календарь и категории не зависят от прогноза —
+    # матрица строится один раз, по волнам перезаписываются только лаговые колонки
+    base = transformer.transform(result)
+    row_group = series_group[np.repeat(np.arange(n_series), horizon)]
+    row_order = np.lexsort((np.arange(len(result)), result['Дата'].to_numpy(), row_group))
+    _, wave = block_positions([row_group[row_order]])
+    wave_bounds = np.r_[0, np.cumsum(np.bincount(wave))]
+    row_order = row_order[np.argsort(wave, kind='stable')]
+
+    preds = np.empty(len(result))
+    for lo, hi in zip(wave_bounds[:-1], wave_bounds[1:]):
+        rows = row_order[lo:hi]
+        groups = row_group[rows]
+        tg = t[groups]
+        X = base[rows]
+        step_cols = {}
+        for lag in params['lags']:
+            step_cols[f'lag_{lag}'] = buf[groups, (tg - lag) % depth]
+        for stat in params['stats']:
+            for window in params['windows']:
+                step_cols[f'rolling_{stat}_{window}'] = _rolling(_window(buf, groups, tg, window), stat)
+        for span, (num, den) in ewm.items():
+            with np.errstate(invalid='ignore', divide='ignore'):
+                step_cols[f'ewm_{span}'] = np.where(den[groups] > 0, num[groups] / den[groups], np.nan)
+        for name, col in step_cols.items():
+            if name in index:
+                X[:, index[name]] = np.nan_to_num(col, nan=0.0)
+
+        step_pred = forecast(model, X)
+        preds[rows] = step_pred
+        buf[groups, tg % depth] = step_pred
+        t[groups] += 1
+        for span, (num, den) in ewm.items():
+            decay = 1 - 2.0 / (span + 1)
+            num[groups] = num[groups] * decay + step_pred
+            den[groups] = den[groups] * decay + 1
+
+    result['prediction'] = preds
+    return result
+
+
+def cached_forecast_horizon(history, horizon, model_path='model.pkl', cache=forecast_cache):
+    # Модель и трансформер берутся из реестра; версия модели входит в ключ кэша
+    entry = model_store.get(model_path)
+    key = make_key('horizon', frame_fingerprint(history), horizon, entry.version)
+    result = cache.get_or_compute(
+        key, lambda: forecast_horizon(entry.model, history, horizon, transformer=entry.transformer))
+    return result.copy()
+
+
+def forecast_next_days(days, df=None, model=None):
+    log(f"Прогноз на следующие {days} дней...")
+    # df — уже очищенная история (например, из PipelineSession); иначе читаем с диска
+    if df is None:
+        df = load_data('data/raw/sales_data.xlsx')
+        df = clean_data(df)
+    if model is None:
+        result = cached_forecast_horizon(df, days)
+    else:
+        result = forecast_horizon(model, df, days)
+
+    # Добавим реальные продажи (если были)
+    truth = df[df['Дата'].isin(result['Дата'])][KEY_COLS + ['Продажи_кг']]
+    result = result.merge(truth, on=KEY_COLS, how='left')
+
+    path = f'data/processed/sales_forecast_next_{days}_days'
+    save_to_csv_and_json(result, path)
+    log(f"Прогноз на {days} дней сохранён в {path}.csv и .json.")
+
+    # Вывод метрик, если есть реальные значения
+    if result['Продажи_кг'].notna().any():
+        metrics = calc_metrics(result['Продажи_кг'].fillna(0), result['prediction'])
+        mape_str = f"{metrics['MAPE']:.2f}%" if not pd.isna(metrics['MAPE']) else "—"
+        log(f"[{days}-day forecast] MAE: {metrics['MAE']:.2f}, RMSE: {metrics['RMSE']:.2f}, MAPE: {mape_str}")
+    return result
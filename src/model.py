@@ -1,21 +1,31 @@
 import lightgbm as lgb
 from sklearn.model_selection import train_test_split
-import joblib
+from src.features import save_feature_meta
+from src.feature_schema import build_manifest
+from src.model_store import model_store, save_model
+from src.profiling import profiled
 
-def train_model(df, features, target):
+MODEL_PARAMS = dict(
+    n_estimators=500,
+    learning_rate=0.05,
+    num_leaves=64,
+    subsample=0.8,
+    colsample_bytree=0.8,
+    random_state=42
+)
+
+@profiled('train_model')
+def train_model(df, features, target, path='model.pkl', params=None, clean_stats=None):
     X = df[features]
     y = df[target]
-    model = lgb.LGBMRegressor(
-        n_estimators=500,
-        learning_rate=0.05,
-        num_leaves=64,
-        subsample=0.8,
-        colsample_bytree=0.8,
-        random_state=42
-    )
+    model = lgb.LGBMRegressor(**MODEL_PARAMS)
     model.fit(X, y)
-    joblib.dump(model, 'model.pkl')
+    # Манифест признаков сохраняется рядом с моделью, чтобы инференс
+    # строил колонки в той же раскладке и с теми же кодами категорий
+    save_feature_meta(build_manifest(X, target, params, clean_stats), path)
+    save_model(model, path)
     return model
 
 def load_model(path='model.pkl'):
-    return joblib.load(path)
\ No newline at end of file
+    # Модель берётся из процессного реестра: с диска читается только новая версия файла
+    return model_store.get(path).model
\ No newline at end of file
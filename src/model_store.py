@@ -0,0 +1,151 @@
+import os
+import time
+import threading
+import joblib
+import lightgbm as lgb
+from src.features import features_path
+from src.feature_schema import load_transformer
+from src.forecast_cache import model_fingerprint, make_key
+from src.profiling import stage
+from src.utils import log, replace_file
+
+# Процессный реестр моделей: модель и её трансформер признаков загружаются один раз
+# на версию файла и дальше отдаются из памяти. Новая версия файла подхватывается
+# при следующем обращении и подменяет текущую одной операцией присваивания.
+
+BOOSTER_SUFFIX = '.lgb.txt'
+
+
+def booster_path(model_path='model.pkl'):
+    return os.path.splitext(model_path)[0] + BOOSTER_SUFFIX
+
+
+def save_model(model, path='model.pkl'):
+    replace_file(path, lambda tmp: joblib.dump(model, tmp))
+    # Нативный текстовый формат LightGBM пишется после pickle и поэтому свежее его
+    if hasattr(model, 'booster_'):
+        replace_file(booster_path(path), lambda tmp: model.booster_.save_model(tmp))
+    elif os.path.exists(booster_path(path)):
+        os.remove(booster_path(path))
+
+
+class BoosterModel:
+    # Нативный lgb.Booster с интерфейсом LGBMRegressor, достаточным для инференса
+    # и дообучения (feature_name_, booster_, predict)
+
+    def __init__(self, booster):
+        self.booster_ = booster
+        self.feature_name_ = booster.feature_name()
+        self.n_features_in_ = len(self.feature_name_)
+
+    def predict(self, X):
+        return self.booster_.predict(X)
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+class ModelEntry:
+
+    def __init__(self, path, version, model, transformer, source, load_seconds, stamp):
+        self.path = path
+        self.version = version
+        self.model = model
+        self.transformer = transformer
+        self.source = source
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self.stamp = stamp
+
+    def info(self):
+        return {
+            'path': self.path,
+            'version': self.version,
+            'source': self.source,
+            'load_seconds': round(self.load_seconds, 4),
+            'loaded_at': self.loaded_at,
+        }
+
+
+class ModelStore:
+
+    def __init__(self, keep_versions=2):
+        self.keep_versions = keep_versions
+        self._current = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.load_seconds = 0.0
+
+    def _stamp(self, path):
+        # Манифест признаков входит в отметку: его замена тоже требует перезагрузки трансформера
+        return _stat(path), _stat(booster_path(path)), _stat(features_path(path))
+
+    def _source(self, path, stamp):
+        pkl_stat, native_stat = stamp[:2]
+        use_native = native_stat is not None and (pkl_stat is None or native_stat[0] >= pkl_stat[0])
+        return (booster_path(path), 'native') if use_native else (path, 'pickle')
+
+    def _load(self, path, stamp, source, kind, version):
+        start = time.perf_counter()
+        with stage('model_load') as rec:
+            rec['source'] = kind
+            model = BoosterModel(lgb.Booster(model_file=source)) if kind == 'native' else joblib.load(source)
+            transformer = load_transformer(model, path)
+        elapsed = time.perf_counter() - start
+        self.loads += 1
+        self.load_seconds += elapsed
+        log(f"Модель {source} загружена за {elapsed:.3f} с (версия {version[:12]}).")
+        return ModelEntry(path, version, model, transformer, kind, elapsed, stamp)
+
+    def get(self, path='model.pkl'):
+        stamp = self._stamp(path)
+        entry = self._current.get(path)
+        if entry is not None and entry.stamp == stamp:
+            return entry
+        return self.reload(path)
+
+    def reload(self, path='model.pkl'):
+        # Загрузка идёт под замком, чтобы параллельные запросы не читали файл одновременно;
+        # текущая запись заменяется только полностью собранной новой
+        with self._lock:
+            stamp = self._stamp(path)
+            entry = self._current.get(path)
+            if entry is not None and entry.stamp == stamp:
+                return entry
+            if stamp[:2] == (None, None):
+                raise FileNotFoundError(path)
+            source, kind = self._source(path, stamp)
+            # Версия — модель вместе с манифестом: тот же файл модели с другим манифестом
+            # даёт другие признаки и не должен делить с прежним кэш прогнозов
+            manifest = features_path(path)
+            version = model_fingerprint(source)
+            if stamp[2] is not None:
+                version = make_key(version, model_fingerprint(manifest))
+            versions = self._versions.setdefault(path, {})
+            # Вернувшаяся на диск прежняя версия отдаётся из памяти без повторной загрузки
+            entry = versions.pop(version, None)
+            if entry is None:
+                entry = self._load(path, stamp, source, kind, version)
+            entry.stamp = stamp
+            versions[version] = entry
+            while len(versions) > self.keep_versions:
+                versions.pop(next(iter(versions)))
+            self._current[path] = entry
+            return entry
+
+    def stats(self):
+        return {
+            'loads': self.loads,
+            'load_seconds_total': round(self.load_seconds, 4),
+            'current': {path: entry.info() for path, entry in self._current.items()},
+            'versions': {path: list(versions) for path, versions in self._versions.items()},
+        }
+
+
+model_store = ModelStore()
@@ -0,0 +1,71 @@
+import time
+from src.preprocessing import load_data, fit_clean_stats, clean_data, feature_engineering, train_test_split_by_date
+from src.utils import log
+
+DATA_PATH = 'data/raw/sales_data.xlsx'
+
+
+class PipelineSession:
+    # Сессия одного запуска: каждый этап считается лениво и ровно один раз,
+    # а результат переиспользуется обучением, прогнозом и оценкой.
+    # Кадры сессии общие, поэтому потребители не должны менять их на месте.
+
+    def __init__(self, path=DATA_PATH, days_test=30, encoding='onehot'):
+        self.path = path
+        self.days_test = days_test
+        self.encoding = encoding
+        self._artifacts = {}
+        self.timings = {}
+
+    def _stage(self, name, build, deps=()):
+        if name not in self._artifacts:
+            # Зависимости считаются до старта таймера, чтобы время этапа было только его собственным
+            inputs = [getattr(self, dep) for dep in deps]
+            start = time.perf_counter()
+            self._artifacts[name] = build(*inputs)
+            self.timings[name] = time.perf_counter() - start
+        return self._artifacts[name]
+
+    @property
+    def raw(self):
+        return self._stage('raw', lambda: load_data(self.path))
+
+    @property
+    def clean_stats(self):
+        return self._stage('clean_stats', fit_clean_stats, deps=('raw',))
+
+    @property
+    def cleaned(self):
+        return self._stage('cleaned', clean_data, deps=('raw', 'clean_stats'))
+
+    @property
+    def engineered(self):
+        return self._stage('engineered', lambda df: feature_engineering(
+            df, encoding=self.encoding), deps=('cleaned',))
+
+    @property
+    def split(self):
+        return self._stage('split', lambda df: train_test_split_by_date(
+            df, date_col='Дата', days_test=self.days_test), deps=('engineered',))
+
+    @property
+    def train_df(self):
+        return self.split[0]
+
+    @property
+    def test_df(self):
+        return self.split[1]
+
+    @property
+    def features(self):
+        return [col for col in self.engineered.columns if col not in ['Продажи_кг', 'Дата']]
+
+    def is_computed(self, name):
+        return name in self._artifacts
+
+    def timing_report(self):
+        return dict(self.timings)
+
+    def report(self):
+        for name, seconds in self.timings.items():
+            log(f"Этап {name}: {seconds:.2f} с")
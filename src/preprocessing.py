@@ -1,37 +1,87 @@
 import pandas as pd
+import pyarrow as pa
 from sklearn.impute import SimpleImputer
+from src.data_cache import read_cached, write_cached
+from src.profiling import profiled
+from src.utils import log
+from src.features import add_lag_features, encode_categories, canonicalize_key_columns, CATEGORICAL_COLS, LAGS, WINDOWS, STATS, EWM_SPANS
 
-def load_data(path):
+def normalize_column(col):
+    return col.replace(' ', '_').replace(',', '')
+
+@profiled('load_data')
+def load_data(path, use_cache=True):
+    # Повторные загрузки читаются из колоночного кэша вместо разбора Excel
+    if use_cache:
+        df = read_cached(path)
+        if df is not None:
+            return df
     df = pd.read_excel(path, parse_dates=['Дата'])
-    df.columns = [col.replace(' ', '_').replace(',', '') for col in df.columns]
+    df.columns = [normalize_column(col) for col in df.columns]
+    if use_cache:
+        # Кэш — только ускорение: ошибка записи (недоступный каталог, колонка со смешанными
+        # типами, которую не принимает Parquet) не должна ломать загрузку
+        try:
+            write_cached(path, df)
+        except (OSError, pa.ArrowException) as exc:
+            log(f"Не удалось записать кэш для {path}: {exc}")
     return df
 
-def clean_data(df):
-    df = df[df['Продажи_кг'] >= 0].copy()
-    # Обрезка выбросов (по желанию)
+NUM_COLS = ['Категория_товара', 'Товар', 'Город', 'Группа_клиентов', 'Формат_точки', 'Продажи_кг']
+
+def fit_clean_stats(df):
+    # Статистики очистки: границы обрезки выбросов и медианы для заполнения пропусков
+    df = df[df['Продажи_кг'] >= 0]
     q_low = df['Продажи_кг'].quantile(0.01)
     q_hi  = df['Продажи_кг'].quantile(0.99)
     df = df[(df['Продажи_кг'] >= q_low) & (df['Продажи_кг'] <= q_hi)]
-    imputer = SimpleImputer(strategy='median')
-    num_cols = ['Категория_товара', 'Товар', 'Город', 'Группа_клиентов', 'Формат_точки', 'Продажи_кг']
-    df.loc[:, num_cols] = imputer.fit_transform(df[num_cols])
+    medians = SimpleImputer(strategy='median').fit(df[NUM_COLS]).statistics_
+    return {'q_low': float(q_low), 'q_hi': float(q_hi),
+            'medians': dict(zip(NUM_COLS, medians.tolist()))}
+
+@profiled('clean_data')
+def clean_data(df, stats=None, clip=False):
+    # stats — статистики обучения (на инференсе они не пересчитываются по входным строкам).
+    # clip=True обрезает выбросы по границам вместо удаления строк, чтобы число прогнозов
+    # совпадало с числом входных строк.
+    if stats is None:
+        stats = fit_clean_stats(df)
+    if clip:
+        df = df.copy()
+        df['Продажи_кг'] = df['Продажи_кг'].clip(stats['q_low'], stats['q_hi'])
+    else:
+        # Обрезка выбросов (по желанию)
+        df = df[(df['Продажи_кг'] >= stats['q_low']) & (df['Продажи_кг'] <= stats['q_hi'])].copy()
+    df = df.fillna({col: stats['medians'][col] for col in NUM_COLS})
     return df
 
-def feature_engineering(df, allow_nan_future=False):
-    df = df.sort_values(['Товар', 'Город', 'Дата'])
-    # Лаги
-    for lag in [1, 7, 14]:
-        df[f'lag_{lag}'] = df.groupby(['Товар', 'Город'])['Продажи_кг'].shift(lag)
-    # Скользящее среднее
-    df['rolling_mean_7'] = df.groupby(['Товар', 'Город'])['Продажи_кг'].transform(lambda x: x.shift(1).rolling(7).mean())
-    df['rolling_mean_14'] = df.groupby(['Товар', 'Город'])['Продажи_кг'].transform(lambda x: x.shift(1).rolling(14).mean())
+def train_test_split_by_date(df, date_col='Дата', days_test=30):
+    df = df.sort_values(date_col)
+    test_start = df[date_col].max() - pd.Timedelta(days=days_test-1)
+    train_df = df[df[date_col] < test_start].reset_index(drop=True)
+    test_df = df[df[date_col] >= test_start].reset_index(drop=True)
+    return train_df, test_df
+
+@profiled('feature_engineering')
+def feature_engineering(df, allow_nan_future=False, lags=LAGS, windows=WINDOWS,
+                        stats=STATS, ewm_spans=EWM_SPANS, encoding='onehot', categories=None):
+    df = canonicalize_key_columns(df.sort_values(['Товар', 'Город', 'Дата']))
+    # Лаги и скользящие окна за один проход по отсортированным блокам серий
+    df = add_lag_features(df, 'Продажи_кг', lags=lags, windows=windows,
+                          stats=stats, ewm_spans=ewm_spans)
     # Временные признаки
     df['dayofweek'] = df['Дата'].dt.dayofweek
     df['month'] = df['Дата'].dt.month
     df['year'] = df['Дата'].dt.year
     df['prod_city'] = df['Товар'].astype(str) + '_' + df['Город'].astype(str)
-    df = pd.get_dummies(df, columns=['Категория_товара', 'Товар', 'Город', 'Группа_клиентов', 'Формат_точки', 'prod_city'])
-    df = df.fillna(0)
+    if encoding == 'category':
+        # Коды категорий вместо широкой one-hot матрицы; LightGBM разбирает их нативно
+        df = encode_categories(df, categories)
+        num_cols = [col for col in df.columns if col not in CATEGORICAL_COLS]
+        df[num_cols] = df[num_cols].fillna(0)
+    else:
+        df = pd.get_dummies(df, columns=CATEGORICAL_COLS)
+        df = df.fillna(0)
     if allow_nan_future:
         return df
     else:
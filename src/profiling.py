@@ -0,0 +1,152 @@
+import os
+import sys
+import json
+import time
+import datetime
+import functools
+import threading
+import tracemalloc
+from collections import deque, defaultdict
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Инструментирование этапов: время (wall/CPU), пиковая память, размеры данных.
+# Замеры копятся в одном профилировщике процесса: из него собирается JSON-отчёт
+# запуска и счётчики /metrics в формате Prometheus.
+
+
+def max_rss_mb():
+    # Пиковый RSS процесса; модуля resource нет на Windows — тогда None
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss: килобайты в Linux, байты в macOS
+    return rss / 2**20 if sys.platform == 'darwin' else rss / 1024
+
+
+def _shape(obj):
+    shape = getattr(obj, 'shape', None)
+    if shape is None:
+        return None, None
+    return shape[0], (shape[1] if len(shape) > 1 else 1)
+
+
+class RunProfiler:
+
+    def __init__(self, keep_last=1000):
+        self.run_id = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        self.started = time.time()
+        self.records = deque(maxlen=keep_last)
+        self.totals = defaultdict(lambda: {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'rows': 0, 'errors': 0})
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def trace_memory(self, enabled=True):
+        # tracemalloc даёт пик памяти по каждому этапу, но заметно замедляет выполнение
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not enabled and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    @contextmanager
+    def stage(self, name, data=None):
+        rec = {'stage': name, 'start': time.time()}
+        rec['in_rows'], rec['in_cols'] = _shape(data)
+        tracing = tracemalloc.is_tracing()
+        stack = self._local.__dict__.setdefault('stack', [])
+        if tracing:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            # reset_peak сбрасывает пик и у внешнего этапа, поэтому пики вложенных этапов
+            # поднимаются к нему через стек
+            stack.append(base)
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        error = False
+        try:
+            yield rec
+        except Exception:
+            error = True
+            raise
+        finally:
+            rec['wall_s'] = time.perf_counter() - wall
+            rec['cpu_s'] = time.process_time() - cpu
+            if tracing:
+                peak = max(tracemalloc.get_traced_memory()[1], stack.pop())
+                if stack:
+                    stack[-1] = max(stack[-1], peak)
+                rec['peak_mem_mb'] = (peak - base) / 2**20
+            rss = max_rss_mb()
+            if rss is not None:
+                rec['max_rss_mb'] = rss
+            rec['error'] = error
+            self._add(rec)
+
+    def _add(self, rec):
+        with self._lock:
+            self.records.append(rec)
+            total = self.totals[rec['stage']]
+            total['calls'] += 1
+            total['wall_s'] += rec['wall_s']
+            total['cpu_s'] += rec['cpu_s']
+            total['rows'] += rec.get('out_rows') or rec.get('in_rows') or 0
+            total['errors'] += rec['error']
+
+    def profiled(self, name=None):
+        def decorator(fn):
+            stage_name = name or fn.__name__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                data = next((a for a in args if hasattr(a, 'shape')), None)
+                with self.stage(stage_name, data) as rec:
+                    out = fn(*args, **kwargs)
+                    rec['out_rows'], rec['out_cols'] = _shape(out)
+                    return out
+            return wrapper
+        return decorator
+
+    def report(self):
+        with self._lock:
+            return {
+                'run_id': self.run_id,
+                'started': datetime.datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+                'stages': list(self.records),
+                'totals': {name: dict(total) for name, total in self.totals.items()},
+            }
+
+    def save_report(self, path):
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+
+    def prometheus(self, prefix='sales'):
+        lines = []
+        metrics = (('calls', 'stage_calls_total', 'Число вызовов этапа'),
+                   ('wall_s', 'stage_wall_seconds_total', 'Суммарное время этапа'),
+                   ('cpu_s', 'stage_cpu_seconds_total', 'Суммарное процессорное время этапа'),
+                   ('rows', 'stage_rows_total', 'Обработано строк'),
+                   ('errors', 'stage_errors_total', 'Число ошибок этапа'))
+        with self._lock:
+            totals = {name: dict(total) for name, total in self.totals.items()}
+        for key, metric, help_text in metrics:
+            lines.append(f'# HELP {prefix}_{metric} {help_text}')
+            lines.append(f'# TYPE {prefix}_{metric} counter')
+            for name, total in sorted(totals.items()):
+                lines.append(f'{prefix}_{metric}{{stage="{name}"}} {total[key]}')
+        rss = max_rss_mb()
+        if rss is not None:
+            lines.append(f'# TYPE {prefix}_process_max_rss_bytes gauge')
+            lines.append(f'{prefix}_process_max_rss_bytes {int(rss * 2**20)}')
+        return '\n'.join(lines) + '\n'
+
+
+profiler = RunProfiler()
+profiled = profiler.profiled
+stage = profiler.stage
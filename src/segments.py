@@ -0,0 +1,158 @@
+import os
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+import lightgbm as lgb
+from src.features import save_feature_meta
+from src.feature_schema import build_manifest
+from src.forecast import forecast
+from src.model import MODEL_PARAMS
+from src.model_store import save_model
+from src.profiling import profiled
+
+# Обучение отдельных моделей по сегментам (например, по Город) в пуле процессов.
+# Матрица признаков кладётся в общую память один раз, процессы читают её без копирования через pickle.
+
+def to_matrix(X):
+    # bool/числовые колонки — как есть, категории — их коды (пропуск = NaN)
+    out = np.empty(X.shape, dtype=np.float32)
+    categorical = []
+    for j, col in enumerate(X.columns):
+        if isinstance(X[col].dtype, pd.CategoricalDtype):
+            codes = X[col].cat.codes.to_numpy()
+            out[:, j] = np.where(codes < 0, np.nan, codes)
+            categorical.append(j)
+        else:
+            out[:, j] = X[col].to_numpy(dtype=np.float32)
+    return out, categorical
+
+
+def thread_budget(n_segments, n_workers=None, cpu_count=None):
+    # Процессы × потоки LightGBM не превышают число ядер
+    cpu_count = cpu_count or os.cpu_count() or 1
+    workers = max(1, min(n_segments, n_workers or cpu_count, cpu_count))
+    return workers, max(1, cpu_count // workers)
+
+
+def fit_rows(X, y, rows, categorical, n_jobs):
+    model = lgb.LGBMRegressor(n_jobs=n_jobs, verbose=-1, **MODEL_PARAMS)
+    model.fit(X[rows], y[rows], categorical_feature=categorical or 'auto')
+    return model
+
+
+@contextmanager
+def shared_arrays(X, y):
+    # Копирует X (float32) и y (float64) в общую память; отдаёт описание для воркеров
+    shms = []
+    try:
+        spec = []
+        for arr in (X, y):
+            shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+            shms.append(shm)
+            np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[:] = arr
+            spec.append((shm.name, arr.shape, arr.dtype.str))
+        yield tuple(spec)
+    finally:
+        for shm in shms:
+            shm.close()
+            shm.unlink()
+
+
+@contextmanager
+def attached_arrays(spec):
+    shms = [shared_memory.SharedMemory(name=name) for name, _, _ in spec]
+    try:
+        yield tuple(np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+                    for shm, (_, shape, dtype) in zip(shms, spec))
+    finally:
+        for shm in shms:
+            shm.close()
+
+
+def _fit_segment(spec, rows, categorical, n_jobs):
+    with attached_arrays(spec) as (X, y):
+        return fit_rows(X, y, rows, categorical, n_jobs)
+
+
+# Ключ задачи общей модели в пуле обучения (не пересекается с метками сегментов)
+_GLOBAL = ('__global__',)
+
+
+class SegmentModelRegistry:
+    # Набор моделей по сегментам с тем же интерфейсом predict, что и у одной модели:
+    # сегмент строки определяется по её же признакам (one-hot слот или код категории).
+
+    def __init__(self, manifest, segment_col, models=None, fallback=None):
+        self.manifest = manifest
+        self.segment_col = segment_col
+        self.models = models or {}
+        self.fallback = fallback
+        self.feature_name_ = manifest['columns']
+        index = {name: i for i, name in enumerate(manifest['columns'])}
+        self.vocab = [str(v) for v in manifest['categories'][segment_col]]
+        if manifest['encoding'] == 'category':
+            self._slot = index[segment_col]
+            self._slots = None
+        else:
+            self._slot = None
+            self._slots = np.array([index[f'{segment_col}_{v}'] for v in self.vocab], dtype=np.int64)
+
+    def segments_of(self, X):
+        if self._slots is not None:
+            block = X[:, self._slots]
+            codes = np.where(block.max(axis=1) > 0, block.argmax(axis=1), -1)
+        else:
+            col = X[:, self._slot]
+            codes = np.where(np.isnan(col), -1, col).astype(np.int64)
+        labels = np.array(self.vocab + [None], dtype=object)
+        return labels[codes]
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        segments = self.segments_of(X)
+        preds = np.full(len(X), np.nan)
+        for segment in pd.unique(segments):
+            rows = np.flatnonzero(segments == segment)
+            model = self.models.get(segment, self.fallback)
+            if model is None:
+                # Строки без модели не превращаются молча в NaN в выгрузках и метриках
+                raise ValueError(f"Нет модели для сегмента {segment!r} ({len(rows)} строк), "
+                                 f"а общая модель не задана")
+            preds[rows] = forecast(model, X[rows])
+        return preds
+
+
+@profiled('train_segment_models')
+def train_segment_models(df, features, target, segment_col='Город', n_workers=None,
+                         path='model.pkl', params=None, clean_stats=None, fallback=True):
+    # fallback=True — дополнительно обучается общая модель на всех строках для сегментов,
+    # не встречавшихся в обучении; можно передать готовую модель или None (тогда такие строки — ошибка)
+    X_df = df[features]
+    manifest = build_manifest(X_df, target, params, clean_stats)
+    X, categorical = to_matrix(X_df)
+    y = df[target].to_numpy(dtype=np.float64)
+    registry = SegmentModelRegistry(manifest, segment_col, fallback=None if fallback is True else fallback)
+    segments = registry.segments_of(X)
+    groups = {seg: np.flatnonzero(segments == seg) for seg in pd.unique(segments) if seg is not None}
+
+    tasks = dict(groups)
+    if fallback is True:
+        tasks[_GLOBAL] = np.arange(len(y))
+    workers, n_jobs = thread_budget(len(tasks), n_workers)
+    # spawn: форк процесса с уже запущенными потоками OpenMP может зависнуть
+    ctx = multiprocessing.get_context('spawn')
+    with shared_arrays(X, y) as spec, ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        # Крупные сегменты (и общая модель) запускаются первыми, чтобы не оставлять хвост из одной долгой задачи
+        order = sorted(tasks, key=lambda seg: -len(tasks[seg]))
+        futures = {seg: pool.submit(_fit_segment, spec, tasks[seg], categorical, n_jobs)
+                   for seg in order}
+        models = {seg: fut.result() for seg, fut in futures.items()}
+    registry.fallback = models.pop(_GLOBAL, registry.fallback)
+    registry.models = models
+
+    save_feature_meta(manifest, path)
+    save_model(registry, path)
+    return registry
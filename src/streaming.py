@@ -0,0 +1,220 @@
+import os
+import math
+import shutil
+import tempfile
+from collections import Counter
+import numpy as np
+import pandas as pd
+from src.preprocessing import normalize_column, clean_data, feature_engineering, NUM_COLS
+from src.features import GROUP_COLS
+
+# Потоковая загрузка истории, которая не помещается в память:
+#   проход 1 — границы обрезки выбросов по скетчу квантилей;
+#   проход 2 — фильтрация, медианы и раскладка строк по партициям (Товар, Город) на диск;
+#   проход 3 — признаки по каждой партиции целиком, так что лаги не рвутся на границах чанков.
+
+TARGET = 'Продажи_кг'
+KEY_COLS = [col for col in NUM_COLS if col != TARGET]
+
+
+def iter_chunks(path, chunksize=100_000):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        chunks = pd.read_csv(path, chunksize=chunksize)
+    elif ext == '.parquet':
+        import pyarrow.parquet as pq
+        chunks = (batch.to_pandas() for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize))
+    elif ext in ('.xlsx', '.xlsm'):
+        chunks = _iter_excel(path, chunksize)
+    else:
+        raise ValueError(f"Неподдерживаемый формат: {path}")
+    for chunk in chunks:
+        chunk.columns = [normalize_column(str(col)) for col in chunk.columns]
+        chunk['Дата'] = pd.to_datetime(chunk['Дата'])
+        yield chunk
+
+
+def _iter_excel(path, chunksize):
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows)
+        buf = []
+        for row in rows:
+            buf.append(row)
+            if len(buf) >= chunksize:
+                yield pd.DataFrame(buf, columns=header)
+                buf = []
+        if buf:
+            yield pd.DataFrame(buf, columns=header)
+    finally:
+        wb.close()
+
+
+class QuantileSketch:
+    # Скетч с относительной точностью alpha для неотрицательных значений
+    # (логарифмические корзины, как в DDSketch); скетчи можно объединять.
+
+    def __init__(self, alpha=0.01):
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self.log_gamma = math.log(self.gamma)
+        self.zeros = 0
+        self.buckets = Counter()
+        self.count = 0
+
+    def add(self, values):
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        positive = values[values > 0]
+        self.zeros += int((values == 0).sum())
+        idx, counts = np.unique(np.ceil(np.log(positive) / self.log_gamma).astype(np.int64), return_counts=True)
+        self.buckets.update(dict(zip(idx.tolist(), counts.tolist())))
+        self.count += len(values)
+
+    def merge(self, other):
+        self.zeros += other.zeros
+        self.buckets.update(other.buckets)
+        self.count += other.count
+
+    def quantile(self, q):
+        if self.count == 0:
+            return float('nan')
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for idx in sorted(self.buckets):
+            seen += self.buckets[idx]
+            if rank < seen:
+                return 2 * self.gamma ** idx / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+def _exact_median(counter):
+    values = sorted(counter)
+    total = sum(counter.values())
+    seen = 0
+    lo = hi = None
+    for value in values:
+        seen += counter[value]
+        if lo is None and seen > (total - 1) // 2:
+            lo = value
+        if seen > total // 2:
+            hi = value
+            break
+    return (lo + hi) / 2
+
+
+def _partition_of(df, n_partitions):
+    keys = df[GROUP_COLS].astype('float64')
+    return (pd.util.hash_pandas_object(keys, index=False).to_numpy() % n_partitions).astype(np.int64)
+
+
+def _as_int(value):
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def _restore_int(df, cols):
+    # После заполнения пропусков коды категорий возвращаются к целому типу
+    for col in cols:
+        values = df[col].to_numpy()
+        if df[col].dtype.kind == 'f' and np.all(np.mod(values, 1) == 0):
+            df[col] = values.astype(np.int64)
+    return df
+
+
+class StreamingIngest:
+
+    def __init__(self, path, chunksize=100_000, n_partitions=16, spill_dir=None, alpha=0.01):
+        self.path = path
+        self.chunksize = chunksize
+        self.n_partitions = n_partitions
+        self.alpha = alpha
+        self.spill_dir = spill_dir or tempfile.mkdtemp(prefix='sales_spill_')
+        self.stats = None
+        self.categories = None
+
+    def _chunks(self):
+        return iter_chunks(self.path, self.chunksize)
+
+    def fit_bounds(self):
+        sketch = QuantileSketch(self.alpha)
+        for chunk in self._chunks():
+            values = chunk[TARGET].to_numpy(dtype='float64')
+            sketch.add(values[values >= 0])
+        return sketch.quantile(0.01), sketch.quantile(0.99)
+
+    def spill(self, q_low, q_hi):
+        target_sketch = QuantileSketch(self.alpha)
+        key_counts = {col: Counter() for col in KEY_COLS}
+        pairs = set()
+        for i, chunk in enumerate(self._chunks()):
+            chunk = chunk[(chunk[TARGET] >= q_low) & (chunk[TARGET] <= q_hi)]
+            target_sketch.add(chunk[TARGET].to_numpy())
+            for col in KEY_COLS:
+                key_counts[col].update(chunk[col].dropna().value_counts().to_dict())
+            chunk = chunk.astype({col: 'float64' for col in NUM_COLS})
+            # Строки без Товар/Город попадут в свою партицию после заполнения медианой
+            pending = chunk[GROUP_COLS].isna().any(axis=1).to_numpy()
+            self._write(chunk[pending], 'pending', i)
+            ready = chunk[~pending]
+            pairs.update(ready[GROUP_COLS].drop_duplicates().itertuples(index=False, name=None))
+            parts = _partition_of(ready, self.n_partitions)
+            for p in np.unique(parts):
+                self._write(ready[parts == p], p, i)
+        medians = {col: _exact_median(key_counts[col]) for col in KEY_COLS}
+        medians[TARGET] = target_sketch.quantile(0.5)
+        self.stats = {'q_low': float(q_low), 'q_hi': float(q_hi), 'medians': medians}
+        pending = self._read('pending')
+        if pending is not None:
+            pending = pending[GROUP_COLS].fillna({col: medians[col] for col in GROUP_COLS})
+            pairs.update(pending.drop_duplicates().itertuples(index=False, name=None))
+        self.categories = self._vocabulary(key_counts, medians, pairs)
+        return self.stats
+
+    def _write(self, df, partition, chunk_no):
+        if df.empty:
+            return
+        part_dir = os.path.join(self.spill_dir, f'part-{partition}')
+        os.makedirs(part_dir, exist_ok=True)
+        df.to_parquet(os.path.join(part_dir, f'chunk-{chunk_no:06d}.parquet'), index=False)
+
+    def _vocabulary(self, key_counts, medians, pairs):
+        vocab = {}
+        for col in KEY_COLS:
+            values = set(key_counts[col]) | {medians[col]}
+            vocab[col] = sorted(_as_int(v) for v in values)
+        vocab['prod_city'] = sorted({f'{_as_int(p)}_{_as_int(c)}' for p, c in pairs})
+        return vocab
+
+    def _read(self, partition):
+        part_dir = os.path.join(self.spill_dir, f'part-{partition}')
+        if not os.path.isdir(part_dir):
+            return None
+        return pd.read_parquet(part_dir)
+
+    def iter_clean_partitions(self):
+        pending = self._read('pending')
+        if pending is not None:
+            pending = clean_data(pending, self.stats)
+            pending_parts = _partition_of(pending, self.n_partitions)
+        for p in range(self.n_partitions):
+            part = self._read(p)
+            if pending is not None and (pending_parts == p).any():
+                part = pd.concat([part, pending[pending_parts == p]], ignore_index=True)
+            if part is None or part.empty:
+                continue
+            yield _restore_int(clean_data(part, self.stats), KEY_COLS)
+
+    def iter_features(self, **fe_kwargs):
+        # Каждая партиция содержит серии (Товар, Город) целиком; кодирование категорий
+        # общее для всех партиций, поэтому колонки у всех выдаваемых кадров совпадают
+        if self.stats is None:
+            self.spill(*self.fit_bounds())
+        for part in self.iter_clean_partitions():
+            yield feature_engineering(part, encoding='category', categories=self.categories, **fe_kwargs)
+
+    def cleanup(self):
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
@@ -1,15 +1,25 @@
+import os
 import pandas as pd
 import numpy as np
 import datetime
+from src.export import export_frame, KEY_COLUMNS
 
 def log(msg):
     print(f"[{datetime.datetime.now():%Y-%m-%d %H:%M:%S}] {msg}")
 
-def save_to_csv_and_json(df, path_base):
-    csv_path = path_base + ".csv"
-    json_path = path_base + ".json"
-    df.to_csv(csv_path, index=False, encoding='utf-8-sig')
-    df.to_json(json_path, orient='records', force_ascii=False, date_format='iso', indent=2)
+def replace_file(path, write):
+    # Запись во временный файл и os.replace: читатель никогда не видит файл наполовину
+    tmp = f'{path}.tmp{os.getpid()}'
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def save_to_csv_and_json(df, path_base, columns=KEY_COLUMNS):
+    # JSON без отступов: форматированный вывод в разы больше и медленнее
+    export_frame(df, path_base, formats=('csv', 'json'), columns=columns)
 
 def calc_metrics(y_true, y_pred):
     from sklearn.metrics import mean_absolute_error, mean_squared_error
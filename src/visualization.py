@@ -1,32 +1,98 @@
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-import plotly.express as px
+import plotly.graph_objects as go
 
-def plot_forecast_matplotlib(path, title='Прогноз продаж'):
-    df = pd.read_csv(path)
-    if 'Дата' in df.columns:
-        df['Дата'] = pd.to_datetime(df['Дата'])
-    plt.figure(figsize=(12, 6))
-    if 'Город' in df.columns:
-        for city in df['Город'].unique():
-            city_data = df[df['Город'] == city]
-            plt.plot(city_data['Дата'], city_data['prediction'], marker='o', label=f"Город {city}")
-        plt.legend()
+# Графики строятся по агрегату Город × Дата: один groupby вместо маски на каждый город.
+# Длинные линии прореживаются LTTB до max_points точек с сохранением формы,
+# в Plotly используются WebGL-трассы (Scattergl).
+
+MAX_POINTS = 1000
+MARKER_POINTS = 60
+
+
+def _as_frame(data):
+    # Принимает DataFrame или путь к CSV/Parquet
+    if isinstance(data, pd.DataFrame):
+        df = data
+    elif str(data).endswith('.parquet'):
+        df = pd.read_parquet(data)
     else:
-        plt.plot(df['Дата'], df['prediction'], marker='o')
-    plt.title(title)
-    plt.xlabel("Дата")
-    plt.ylabel("Продажи (прогноз)")
-    plt.grid()
-    plt.tight_layout()
-    plt.show()
-
-def plot_forecast_plotly(path, title='Прогноз продаж'):
-    df = pd.read_csv(path)
-    if 'Дата' in df.columns:
-        df['Дата'] = pd.to_datetime(df['Дата'])
+        df = pd.read_csv(data)
+    if 'Дата' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['Дата']):
+        df = df.assign(Дата=pd.to_datetime(df['Дата']))
+    return df
+
+
+def lttb(x, y, threshold):
+    # Largest-Triangle-Three-Buckets: индексы threshold точек, лучше всего передающих форму ряда
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    idx = np.empty(threshold, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        nxt_start, nxt_end = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x = x[nxt_start:nxt_end].mean()
+        avg_y = y[nxt_start:nxt_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        idx[i + 1] = a
+    return idx
+
+
+def city_series(data, value='prediction', max_points=MAX_POINTS):
+    # Список (город, даты, значения); без колонки Город — одна линия с городом None
+    df = _as_frame(data)
     if 'Город' in df.columns:
-        fig = px.line(df, x='Дата', y='prediction', color='Город', title=title, markers=True)
+        agg = df.groupby(['Город', 'Дата'], sort=True)[value].sum()
+        cities = agg.index.get_level_values(0).to_numpy()
+        dates = agg.index.get_level_values(1).to_numpy()
     else:
-        fig = px.line(df, x='Дата', y='prediction', title=title, markers=True)
-    fig.show()
+        agg = df.groupby('Дата', sort=True)[value].sum()
+        cities = np.full(len(agg), None)
+        dates = agg.index.to_numpy()
+    values = agg.to_numpy(dtype=np.float64)
+    # Агрегат отсортирован по городу: линии — непрерывные блоки строк
+    bounds = np.flatnonzero(cities[1:] != cities[:-1]) + 1
+    series = []
+    for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(values)]):
+        x, y = dates[lo:hi], values[lo:hi]
+        keep = lttb(x.astype('datetime64[ns]').astype(np.int64), y, max_points)
+        series.append((cities[lo], x[keep], y[keep]))
+    return series
+
+
+def plot_forecast_matplotlib(data, title='Прогноз продаж', value='prediction', max_points=MAX_POINTS, show=True):
+    series = city_series(data, value, max_points)
+    fig, ax = plt.subplots(figsize=(12, 6))
+    for city, x, y in series:
+        # Маркеры только на коротких линиях: на тысячах точек они лишь замедляют отрисовку
+        ax.plot(x, y, marker='o' if len(x) <= MARKER_POINTS else None,
+                label=f"Город {city}" if city is not None else None)
+    if any(city is not None for city, _, _ in series):
+        ax.legend()
+    ax.set_title(title)
+    ax.set_xlabel("Дата")
+    ax.set_ylabel("Продажи (прогноз)")
+    ax.grid()
+    fig.tight_layout()
+    if show:
+        plt.show()
+    return fig
+
+
+def plot_forecast_plotly(data, title='Прогноз продаж', value='prediction', max_points=MAX_POINTS, show=True):
+    fig = go.Figure()
+    for city, x, y in city_series(data, value, max_points):
+        fig.add_trace(go.Scattergl(x=x, y=y, name=str(city) if city is not None else value,
+                                   mode='lines+markers' if len(x) <= MARKER_POINTS else 'lines'))
+    fig.update_layout(title=title, xaxis_title='Дата', yaxis_title=value, legend_title_text='Город')
+    if show:
+        fig.show()
+    return fig